@@ -1,9 +1,13 @@
+from app.util import startup_timer
 from PyQt5.QtWidgets import QApplication
 from app.screens.main_window import MainWindow
 import sys
 
 if __name__ == "__main__":
+    startup_timer.mark("imports")
     app = QApplication(sys.argv)
     window = MainWindow()
+    startup_timer.mark("main window built")
     window.show()
+    startup_timer.mark("main window shown")
     sys.exit(app.exec_())
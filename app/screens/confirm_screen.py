@@ -1,11 +1,14 @@
 from PyQt5.QtWidgets import QWidget, QLabel, QVBoxLayout, QPushButton, QHBoxLayout
-from PyQt5.QtGui import QImage, QPixmap, QPainter, QPen
+from PyQt5.QtGui import QImage, QPainter, QPen
 from PyQt5.QtCore import Qt, QTimer, QRect, QPoint
-import cv2
-from ultralytics import YOLO
 
 from app.theme import apply_theme
-from app.util.config_manager import load_config, save_config
+from app.util import startup_timer
+from app.util.camera_service import get_camera
+from app.util.config_manager import get_setting, save_config, subscribe_config
+from app.util.frame_display import FrameDisplay
+from app.util.keyboard_detector import get_keyboard_detector
+from app.util.layout_compiler import get_layout
 
 
 class ConfirmScreen(QWidget):
@@ -49,24 +52,34 @@ class ConfirmScreen(QWidget):
         button_layout.addWidget(self.confirm_btn)
         self.layout.addLayout(button_layout)
 
-        self.cap = None
+        self.camera = get_camera()
+        self.camera_acquired = False
+        self.shown_seq = 0
+        self.display = FrameDisplay()
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_frame)
 
         self.key_coords = {}
+        self.key_overlay = None
+        self.key_overlay_origin = QPoint()
+        subscribe_config("keys", self.on_keys_saved)
 
         apply_theme(self)
 
     def start_camera_with_overlay(self):
-        self.cap = cv2.VideoCapture(0, cv2.CAP_DSHOW)
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
+        if not self.camera_acquired:
+            self.camera.acquire()
+            self.camera_acquired = True
 
         self.wait_for_first_frame()
 
     def wait_for_first_frame(self):
-        ret, _ = self.cap.read()
-        if ret:
+        if not self.camera_acquired:
+            return
+        _, entry = self.camera.latest.get()
+        if entry is not None:
+            startup_timer.mark("first camera frame")
+            startup_timer.report()
             self.loading_label.hide()
             self.timer.start(30)
             self.main_window.stack.setCurrentWidget(self)
@@ -75,48 +88,71 @@ class ConfirmScreen(QWidget):
 
     def stop_camera(self):
         self.timer.stop()
-        if self.cap:
-            self.cap.release()
-            self.cap = None
+        if self.camera_acquired:
+            self.camera.release()
+            self.camera_acquired = False
 
     def update_frame(self):
-        if not self.cap or not self.cap.isOpened():
-            return
-
-        ret, frame = self.cap.read()
-        if not ret or frame is None:
-            print("Failed to read frame from webcam")
+        seq, entry = self.camera.latest.get()
+        if entry is None or seq == self.shown_seq:
             return
+        self.shown_seq = seq
+        _, frame = entry
 
         try:
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            h, w, ch = frame_rgb.shape
-            bytes_per_line = ch * w
-            qt_img = QImage(frame_rgb.data, w, h, bytes_per_line, QImage.Format_RGB888)
-
-            pixmap = QPixmap.fromImage(qt_img)
-
-            painter = QPainter(pixmap)
-            pen = QPen(Qt.green, 2, Qt.SolidLine)
-            painter.setPen(pen)
-
-            for label, coords in self.key_coords.items():
-                try:
-                    x1, y1, x2, y2 = coords
-                    rect = QRect(x1, y1, x2 - x1, y2 - y1)
-                    painter.drawRect(rect)
-                    painter.drawText(QPoint(x1 + 5, y1 - 5), label)
-                except Exception as e:
-                    print(f"Error drawing label '{label}': {e}")
-
-            painter.end()
-            self.image_label.setPixmap(pixmap)
+            self.display.load(frame)
+
+            if self.key_overlay is not None:
+                image = self.display.image()
+                painter = QPainter(image)
+                painter.drawImage(self.key_overlay_origin, self.key_overlay)
+                painter.end()
+            self.image_label.setPixmap(self.display.pixmap())
         except Exception as e:
             print("Exception in update_frame:", e)
 
     def load_key_coords(self):
-        data = load_config("keys")
-        return data
+        return get_layout().key_data
+
+    def on_keys_saved(self, name, key_coords):
+        self.set_key_coords(key_coords)
+
+    def set_key_coords(self, key_coords):
+        self.key_coords = key_coords
+        self.key_overlay = self.render_key_overlay()
+
+    def render_key_overlay(self):
+        # Key boxes and labels are static between mappings, so they are drawn
+        # once into a transparent image covering just the keys and blended
+        # over each frame, instead of redrawing every key per frame.
+        if not self.key_coords:
+            return None
+
+        margin = 20
+        boxes = list(self.key_coords.values())
+        left = min(box[0] for box in boxes) - margin
+        top = min(box[1] for box in boxes) - margin
+        right = max(box[2] for box in boxes) + margin
+        bottom = max(box[3] for box in boxes) + margin
+        self.key_overlay_origin = QPoint(left, top)
+
+        overlay = QImage(right - left, bottom - top, QImage.Format_ARGB32_Premultiplied)
+        overlay.fill(Qt.transparent)
+        painter = QPainter(overlay)
+        painter.setPen(QPen(Qt.green, 2, Qt.SolidLine))
+        painter.translate(-left, -top)
+
+        for label, coords in self.key_coords.items():
+            try:
+                x1, y1, x2, y2 = coords
+                rect = QRect(x1, y1, x2 - x1, y2 - y1)
+                painter.drawRect(rect)
+                painter.drawText(QPoint(x1 + 5, y1 - 5), label)
+            except Exception as e:
+                print(f"Error drawing label '{label}': {e}")
+
+        painter.end()
+        return overlay
 
     def go_to_typing_test(self):
         self.stop_camera()
@@ -124,45 +160,47 @@ class ConfirmScreen(QWidget):
 
     def go_to_key_mapper(self):
         self.stop_camera()
-        self.main_window.stack.setCurrentWidget(self.main_window.key_mapper_screen)
+        self.main_window.go_to_key_mapper_screen()
 
     def generate_yolo_keymap(self):
         self.stop_camera()
-        self.main_window.key_mapper_screen.mapping_mode = "YOLO"
-        self.main_window.stack.setCurrentWidget(self.main_window.key_mapper_screen)
+        self.main_window.go_to_key_mapper_screen("YOLO")
 
     def manual_keymap(self):
         self.stop_camera()
-        self.main_window.key_mapper_screen.mapping_mode = "manual"
-        self.main_window.stack.setCurrentWidget(self.main_window.key_mapper_screen)
+        self.main_window.go_to_key_mapper_screen("manual")
+
+    def grab_frames(self, count=1, timeout=5.0):
+        # Reuses the running preview's frames; otherwise borrows the shared
+        # camera just long enough to collect them.
+        frames = []
+        self.camera.acquire()
+        try:
+            seq, entry = self.camera.latest.get()
+            while len(frames) < count:
+                if entry is None or (frames and entry[1] is frames[-1]):
+                    seq, entry = self.camera.wait_for_frame(seq, timeout)
+                    if entry is None:
+                        break
+                frames.append(entry[1])
+        finally:
+            self.camera.release()
+        return frames
 
     def load_yolo_mapping(self):
-        keymap_rel = load_config("keymap")
-
-        cap = cv2.VideoCapture(0)
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-        ret, frame = cap.read()
-        cap.release()
-
-        model = YOLO("runs/detect/train/weights/best.pt")
-        results = model(frame, conf=0.5)[0]
-
-        for box in results.boxes:
-            if model.names[int(box.cls[0])] == "keyboard":
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                abs_keys = {
-                    k: [
-                        int(x1 + v[0] * (x2 - x1)),
-                        int(y1 + v[1] * (y2 - y1)),
-                        int(x1 + v[2] * (x2 - x1)),
-                        int(y1 + v[3] * (y2 - y1)),
-                    ]
-                    for k, v in keymap_rel.items()
-                }
-
-                save_config("keys", abs_keys)
-                self.key_coords = abs_keys
-                self.start_camera_with_overlay()
-                return
+        keyboard_layout = get_layout()
+
+        frames = self.grab_frames(get_setting("yolo_burst_frames", 5))
+        if not frames:
+            print("Failed to read frame from webcam")
+            return
+
+        box = get_keyboard_detector().find_keyboard_in_burst(frames, conf=0.5)
+        if box is None:
+            print("No keyboard detected")
+            return
+
+        abs_keys = keyboard_layout.project(box)
 
+        save_config("keys", abs_keys)
+        self.start_camera_with_overlay()
@@ -1,17 +1,17 @@
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel
-from PyQt5.QtCore import QTimer
-from PyQt5.QtGui import QImage, QPixmap
+from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QLabel
 import cv2
-import mediapipe as mp
-import math
-from app.util.config_manager import load_config
+import time
+from app.util.attribution import Attribution, attribute_keystroke
+from app.util.frame_display import FrameDisplay, opaque
+from app.util.hand_tracker import HandTrackingWorker
+from app.util.key_layout import FINGERTIP_LABELS
+from app.util.layout_compiler import get_layout
+from app.util.latency import get_latency_recorder
+from app.util.landmarks import (
+    FINGER_LANDMARKS, HAND_CONNECTIONS, HAND_LABELS, NUM_LANDMARKS, finger_label, visible_hands
+)
 from app.theme import apply_theme, get_finger_color
 
-SHIFT_KEYS = {
-    "!": "1", "@": "2", "#": "3", "$": "4", "%": "5", "^": "6", "&": "7", "*": "8",
-    "(": "9", ")": "0", "_": "-", "+": "=", ":": ";", "\"": "'", "?": "/", "~": "`"
-}
-
 class FingerTrackingScreen(QWidget):
     def __init__(self):
         super().__init__()
@@ -26,122 +26,94 @@ class FingerTrackingScreen(QWidget):
         self.video_label.setFixedSize(1272, 712)
         self.layout.addWidget(self.video_label)
 
-        self.cap = cv2.VideoCapture(0)
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
+        self.target_key_labels = []
+        self.target_boxes = []
+        self.expected_finger = None
+        self.keyboard_layout = get_layout()
+        self.key_layout = self.keyboard_layout.keys
 
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.update_frame)
-        self.timer.start(30)
+        self.painted_seq = 0
+        self.display = FrameDisplay()
+        self.latency = get_latency_recorder()
+        self.tracker = HandTrackingWorker(self.key_layout)
+        self.tracker.result_ready.connect(self.update_frame)
+        self.tracker.start()
+        QApplication.instance().aboutToQuit.connect(self.tracker.stop)
 
-        self.mp_hands = mp.solutions.hands
-        self.hands = self.mp_hands.Hands()
-        self.mp_draw = mp.solutions.drawing_utils
+        apply_theme(self)
 
-        self.target_key_label = None
-        self.expected_finger = None
-        self.key_data = load_config("keys")
-        self.technique_map = load_config("technique")
+    def set_target_keys(self, key_labels):
+        if not isinstance(key_labels, list):
+            key_labels = [key_labels] if key_labels else []
+        if key_labels == self.target_key_labels:
+            return
+        self.target_key_labels = key_labels
+
+        # Resolved once per target set rather than on every frame.
+        self.target_boxes = []
+        for key in key_labels:
+            if key not in self.key_layout:
+                continue
+            x1, y1, x2, y2 = self.key_layout.boxes[self.key_layout.index[key]].astype(int)
+            fingers = self.keyboard_layout.expected_fingers(key)
+            finger = fingers[0] if fingers else "Unknown"
+            self.target_boxes.append(((x1, y1), (x2, y2), opaque(get_finger_color(finger))))
+
+    def attribute_key_press(self, key_label, timestamp=None):
+        # Attribution(finger, confidence) for a key pressed at timestamp.
+        if key_label not in self.key_layout:
+            print(f"Key '{key_label}' not found.")
+            return Attribution(None, 0.0)
 
-        apply_theme(self)
+        if timestamp is None:
+            timestamp = time.monotonic()
 
-    FINGER_LANDMARKS = {
-        "Thumb": [1, 2, 3, 4],
-        "Index": [5, 6, 7, 8],
-        "Middle": [9, 10, 11, 12],
-        "Ring": [13, 14, 15, 16],
-        "Pinky": [17, 18, 19, 20],
-    }
+        return attribute_keystroke(self.tracker.history, self.key_layout, key_label, timestamp)
 
-    def set_target_keys(self, key_labels):
-        self.target_key_labels = key_labels if isinstance(key_labels, list) else [key_labels]
+    def update_frame(self):
+        seq, latest = self.tracker.latest.get()
+        if latest is None or seq == self.painted_seq:
+            return
+        self.painted_seq = seq
+        paint_start = time.monotonic()
 
-    def get_finger_that_pressed_key(self, key_label):
-        if key_label not in self.key_data:
-            print(f"Key '{key_label}' not found.")
-            return None
+        frame, hands = self.display.load(latest.frame), latest.hands
 
-        x1, y1, x2, y2 = self.key_data[key_label]
-        key_center = ((x1 + x2) // 2, (y1 + y2) // 2)
+        for slot in visible_hands(hands):
+            hand_label = HAND_LABELS[slot]
+            points = [(int(x), int(y)) for x, y, _ in hands[slot]]
 
-        ret, frame = self.cap.read()
-        if not ret:
-            return None
+            for start, end in HAND_CONNECTIONS:
+                cv2.line(frame, points[start], points[end], opaque((255, 255, 255)), 2)
 
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.hands.process(frame_rgb)
+            finger_nodes = set()
 
-        if not results.multi_hand_landmarks or not results.multi_handedness:
-            return None
+            for finger_name, indices in FINGER_LANDMARKS.items():
+                color = opaque(get_finger_color(finger_label(hand_label, finger_name)))
 
-        h, w, _ = frame.shape
-        closest_finger = None
-        min_distance = float("inf")
+                for idx in indices:
+                    cv2.circle(frame, points[idx], 5, color, -1)
+                    finger_nodes.add(idx)
 
-        for hand_landmarks, hand_handedness in zip(results.multi_hand_landmarks, results.multi_handedness):
-            raw_label = hand_handedness.classification[0].label
-            hand_label = "Left" if raw_label == "Right" else "Right"
+            for idx in range(NUM_LANDMARKS):
+                if idx not in finger_nodes:
+                    cv2.circle(frame, points[idx], 5, opaque((255, 255, 255)), -1)
 
-            for tip_idx, name in {4: "Thumb", 8: "Index", 12: "Middle", 16: "Ring", 20: "Pinky"}.items():
-                lm = hand_landmarks.landmark[tip_idx]
-                fx, fy = int(lm.x * w), int(lm.y * h)
-                dist = math.hypot(fx - key_center[0], fy - key_center[1])
-                if dist < min_distance:
-                    min_distance = dist
-                    closest_finger = "Thumb" if name == "Thumb" else f"{hand_label} {name}"
+        if latest.keys is not None:
+            # Outline the key each fingertip is currently over.
+            for tip, key in enumerate(latest.keys):
+                if key >= 0:
+                    x1, y1, x2, y2 = self.key_layout.boxes[key].astype(int)
+                    cv2.rectangle(frame, (x1, y1), (x2, y2), opaque(get_finger_color(FINGERTIP_LABELS[tip])), 1)
 
-        return closest_finger
+        for top_left, bottom_right, color in self.target_boxes:
+            cv2.rectangle(frame, top_left, bottom_right, color, 2)
 
-    def update_frame(self):
-        ret, frame = self.cap.read()
-        if not ret:
-            return
+        self.video_label.setPixmap(self.display.pixmap())
 
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.hands.process(frame_rgb)
-
-        if results.multi_hand_landmarks and results.multi_handedness:
-            for hand_landmarks, hand_handedness in zip(results.multi_hand_landmarks, results.multi_handedness):
-                raw_label = hand_handedness.classification[0].label
-                hand_label = "Left" if raw_label == "Right" else "Right"
-
-                self.mp_draw.draw_landmarks(frame, hand_landmarks, self.mp_hands.HAND_CONNECTIONS)
-
-                h, w, _ = frame.shape
-                finger_nodes = set()
-
-                for finger_name, indices in self.FINGER_LANDMARKS.items():
-                    finger_label = "Thumb" if finger_name == "Thumb" else f"{hand_label} {finger_name}"
-                    color = get_finger_color(finger_label)
-
-                    for idx in indices:
-                        lm = hand_landmarks.landmark[idx]
-                        cx, cy = int(lm.x * w), int(lm.y * h)
-                        cv2.circle(frame, (cx, cy), 5, color, -1)
-                        finger_nodes.add(idx)
-
-                for idx in range(21):
-                    if idx not in finger_nodes:
-                        lm = hand_landmarks.landmark[idx]
-                        cx, cy = int(lm.x * w), int(lm.y * h)
-                        cv2.circle(frame, (cx, cy), 5, (255, 255, 255), -1)
-
-        if self.target_key_labels:
-            for key in self.target_key_labels:
-                if key not in self.key_data:
-                    continue
-                x1, y1, x2, y2 = self.key_data[key]
-                finger = self.technique_map.get(key, "Unknown")
-                if isinstance(finger, list):
-                    finger = finger[0]
-                color = get_finger_color(finger)
-                cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        h, w, ch = frame.shape
-        qt_img = QImage(frame.data, w, h, ch * w, QImage.Format_RGB888)
-        self.video_label.setPixmap(QPixmap.fromImage(qt_img))
+        self.latency.record_since("update_frame", paint_start)
+        self.latency.record_since("frame_to_display", latest.timestamp)
 
     def closeEvent(self, event):
-        self.cap.release()
+        self.tracker.stop()
         event.accept()
@@ -1,9 +1,13 @@
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QPushButton, QInputDialog
-from PyQt5.QtGui import QPixmap, QImage, QPainter, QPen
+from PyQt5.QtGui import QPainter, QPen
 from PyQt5.QtCore import Qt, QRect, QPoint, QTimer
 import cv2
-from ultralytics import YOLO
-from app.util.config_manager import save_config
+from app.util import startup_timer
+from app.util.camera_service import get_camera
+from app.util.config_manager import get_setting, save_config
+from app.util.frame_display import FrameDisplay, opaque
+from app.util.keyboard_box_tracker import KeyboardBoxTracker
+from app.util.keyboard_detector import get_keyboard_detector
 from app.theme import apply_theme
 
 
@@ -37,44 +41,79 @@ class KeyMapperScreen(QWidget):
         self.back_btn.clicked.connect(self.go_back_to_confirm)
         self.layout.addWidget(self.back_btn)
 
-        self.cap = cv2.VideoCapture(0)
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-
+        self.camera = get_camera()
+        self.camera_acquired = False
+        self.shown_seq = 0
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_preview)
-        self.timer.start(30)
 
-        self.yolo_model = YOLO("runs/detect/train/weights/best.pt")
+        self.keyboard_tracker = None
 
         apply_theme(self)
 
+    def start_preview(self):
+        if self.camera_acquired or self.image_label.final_pixmap is not None:
+            return
+        self.camera.acquire()
+        self.camera_acquired = True
+        # In YOLO mode capturing waits for the first keyboard box.
+        self.capture_btn.setEnabled(self.mapping_mode != "YOLO")
+        self.timer.start(30)
+
+    def stop_preview(self):
+        self.timer.stop()
+        if self.keyboard_tracker:
+            self.keyboard_tracker.stop()
+            self.keyboard_tracker = None
+        if self.camera_acquired:
+            self.camera.release()
+            self.camera_acquired = False
+
+    def get_keyboard_tracker(self):
+        if self.keyboard_tracker is None:
+            self.keyboard_tracker = KeyboardBoxTracker(
+                every_n_frames=get_setting("yolo_preview_every_n_frames", 15),
+                motion_threshold=get_setting("yolo_preview_motion_threshold", 6.0),
+            )
+        return self.keyboard_tracker
+
     def update_preview(self):
-        ret, frame = self.cap.read()
-        if ret:
+        seq, entry = self.camera.latest.get()
+        if entry is not None and seq != self.shown_seq:
+            self.shown_seq = seq
+            frame = entry[1]
+            startup_timer.mark("first camera frame")
+            startup_timer.report()
+            box = None
             if self.mapping_mode == "YOLO":
-                results = self.yolo_model(frame, conf=0.5)[0]
-                for box in results.boxes:
-                    cls = int(box.cls[0])
-                    label = self.yolo_model.names[cls]
-                    if label == "keyboard":
-                        x1, y1, x2, y2 = map(int, box.xyxy[0])
-                        frame = cv2.rectangle(frame, (x1, y1), (x2, y2), (255, 0, 0), 2)
-                        self.image_label.set_keyboard_box((x1, y1, x2, y2))
-            self.image_label.show_preview_frame(frame)
+                box = self.get_keyboard_tracker().update(frame)
+                if box:
+                    self.image_label.set_keyboard_box(box)
+                self.capture_btn.setEnabled(box is not None)
+            self.image_label.show_preview_frame(frame, box)
 
     def capture_screenshot(self):
-        ret, frame = self.cap.read()
-        if ret:
-            self.timer.stop()
-            self.cap.release()
-            self.cap = None
+        _, entry = self.camera.latest.get()
+        if entry is not None:
+            frame = entry[1]
+            if self.mapping_mode == "YOLO":
+                # The preview box is smoothed and can be several frames old;
+                # keys are stored relative to the box in the captured frame.
+                box = get_keyboard_detector().find_keyboard(frame)
+                if box is None:
+                    print("No keyboard detected in the captured frame. Try again.")
+                    return
+                self.image_label.set_keyboard_box(tuple(int(round(v)) for v in box))
+            self.stop_preview()
             self.image_label.set_final_frame(frame)
             self.capture_btn.setEnabled(False)
             self.save_btn.setEnabled(True)
             self.undo_btn.setEnabled(True)
 
     def save_coords(self):
+        if self.mapping_mode == "YOLO" and not self.image_label.keyboard_box:
+            print("No keyboard box to map keys against.")
+            return
         coords = self.image_label.get_final_coords()
         target_file = "keymap" if self.mapping_mode == "YOLO" else "keys"
 
@@ -83,9 +122,7 @@ class KeyMapperScreen(QWidget):
         self.main_window.go_to_confirm_screen()
 
     def go_back_to_confirm(self):
-        if self.cap:
-            self.timer.stop()
-            self.cap.release()
+        self.stop_preview()
         self.main_window.go_to_confirm_screen()
 
 
@@ -100,6 +137,7 @@ class DrawLabel(QLabel):
         self.rects = []
         self.key_coords = {}
         self.keyboard_box = None
+        self.display = FrameDisplay()
 
     def set_keyboard_box(self, box):
         self.keyboard_box = box
@@ -126,18 +164,17 @@ class DrawLabel(QLabel):
                 del self.key_coords[label]
             self.update()
 
-    def show_preview_frame(self, frame):
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        h, w, ch = frame.shape
-        qt_image = QImage(frame.data, w, h, ch * w, QImage.Format_RGB888)
-        self.preview_pixmap = QPixmap.fromImage(qt_image)
+    def show_preview_frame(self, frame, box=None):
+        canvas = self.display.load(frame)
+        if box:
+            x1, y1, x2, y2 = box
+            cv2.rectangle(canvas, (x1, y1), (x2, y2), opaque((255, 0, 0)), 2)
+        self.preview_pixmap = self.display.pixmap()
         self.setPixmap(self.preview_pixmap)
 
     def set_final_frame(self, frame):
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        h, w, ch = frame.shape
-        qt_image = QImage(frame.data, w, h, ch * w, QImage.Format_RGB888)
-        self.final_pixmap = QPixmap.fromImage(qt_image)
+        # Detached from the display buffer so later previews cannot change it.
+        self.final_pixmap = self.display.to_pixmap(frame).copy()
         self.setPixmap(self.final_pixmap)
 
     def mousePressEvent(self, event):
@@ -1,9 +1,7 @@
 from PyQt5.QtWidgets import QMainWindow, QStackedWidget
+from PyQt5.QtCore import QTimer
 from app.screens.confirm_screen import ConfirmScreen
-from app.screens.key_mapper_screen import KeyMapperScreen
-from app.screens.result_screen import ResultScreen
 from app.theme import apply_theme
-from app.screens.typing_test_screen import TypingTestScreen
 from app.util.config_manager import config_exists
 
 class MainWindow(QMainWindow):
@@ -15,17 +13,20 @@ class MainWindow(QMainWindow):
         self.stack = QStackedWidget()
         self.setCentralWidget(self.stack)
 
+        # Screens other than the confirm screen are built on first use so the
+        # camera, YOLO and MediaPipe are only loaded once they are needed.
         self.confirm_screen = ConfirmScreen(self)
-        self.key_mapper_screen = KeyMapperScreen(self)
+        self.key_mapper_screen = None
+        self.typing_test_screen = None
+        self.result_screen = None
 
-        self.stack.addWidget(self.confirm_screen)     
-        self.stack.addWidget(self.key_mapper_screen)
+        self.stack.addWidget(self.confirm_screen)
 
         if config_exists("keys") or config_exists("keymap"):
-            self.confirm_screen.start_camera_with_overlay()
-            self.stack.setCurrentIndex(0)
+            self.stack.setCurrentWidget(self.confirm_screen)
+            QTimer.singleShot(0, self.confirm_screen.start_camera_with_overlay)
         else:
-            self.stack.setCurrentIndex(1)
+            QTimer.singleShot(0, self.go_to_key_mapper_screen)
 
         apply_theme(self)
 
@@ -33,13 +34,26 @@ class MainWindow(QMainWindow):
         self.confirm_screen.start_camera_with_overlay()
         self.stack.setCurrentWidget(self.confirm_screen)
 
+    def go_to_key_mapper_screen(self, mapping_mode=None):
+        if self.key_mapper_screen is None:
+            from app.screens.key_mapper_screen import KeyMapperScreen
+            self.key_mapper_screen = KeyMapperScreen(self)
+            self.stack.addWidget(self.key_mapper_screen)
+
+        if mapping_mode:
+            self.key_mapper_screen.mapping_mode = mapping_mode
+        self.key_mapper_screen.start_preview()
+        self.stack.setCurrentWidget(self.key_mapper_screen)
+
     def show_result_screen(self, wpm, accuracy, finger_data, time_taken):
+        from app.screens.result_screen import ResultScreen
         self.result_screen = ResultScreen(self, wpm=wpm, accuracy=accuracy, finger_stats=finger_data,
                                           time_taken=time_taken)
         self.stack.addWidget(self.result_screen)
         self.stack.setCurrentWidget(self.result_screen)
 
     def go_to_typing_test_screen(self):
+        from app.screens.typing_test_screen import TypingTestScreen
         self.typing_test_screen = TypingTestScreen(self)
         self.stack.addWidget(self.typing_test_screen)
         self.stack.setCurrentWidget(self.typing_test_screen)
@@ -4,13 +4,16 @@ from PyQt5.QtCore import Qt, QSize
 import qtawesome as qta
 from PyQt5.QtCore import QSize
 from app.theme import apply_theme
+from app.util.keystroke_log import KeystrokeLog
+from app.util.latency import get_latency_recorder
+from app.util.session_store import SessionStore
 
 
 class ResultScreen(QWidget):
     def __init__(self, main_window, wpm=0, accuracy=100.0, finger_stats=None, time_taken=0):
         super().__init__()
         self.main_window = main_window
-        self.finger_stats = finger_stats or {}
+        self.finger_stats = finger_stats if finger_stats is not None else KeystrokeLog()
         self.time_taken = time_taken
 
         self.technique_accuracy = self.calculate_technique_accuracy()
@@ -46,6 +49,20 @@ class ResultScreen(QWidget):
         metrics_layout.addLayout(create_metric_block("Technique", f"{self.technique_accuracy:.1f}%"))
         metrics_layout.addLayout(create_metric_block("Time", f"{self.time_taken}s"))
 
+        history = SessionStore()
+        if history.session_count:
+            metrics_layout.addLayout(create_metric_block("All-time Technique", f"{history.technique_accuracy():.1f}%"))
+
+        self.latency = get_latency_recorder()
+        latency_label = QLabel(self.latency.format_summary())
+        latency_label.setAlignment(Qt.AlignCenter)
+        latency_label.setStyleSheet("font-size: 12px; font-family: 'Consolas', 'Courier New', monospace;")
+        layout.addWidget(latency_label)
+
+        save_latency_btn = QPushButton("Save Latency Report")
+        save_latency_btn.clicked.connect(self.save_latency_report)
+        layout.addWidget(save_latency_btn, alignment=Qt.AlignCenter)
+
         restart_btn = QPushButton()
         restart_btn.setFixedSize(50, 50)
         restart_btn.setIcon(qta.icon("fa5s.sync", color="#B0D4CC"))
@@ -60,24 +77,20 @@ class ResultScreen(QWidget):
         apply_theme(self)
 
     def calculate_technique_accuracy(self):
-        total = 0
-        correct = 0
-        for entries in self.finger_stats.values():
-            for entry in entries:
-                total += 1
-                if entry.get("correct"):
-                    correct += 1
-        return (correct / total) * 100 if total else 0.0
+        return self.finger_stats.technique_accuracy()
 
     def print_finger_stats(self):
         print("\n====== Finger Technique Accuracy Breakdown ======")
-        for key, entries in self.finger_stats.items():
-            for entry in entries:
-                used = entry.get("used")
-                expected = entry.get("expected")
-                correct = entry.get("correct")
-                print(f"Key: {key} | Used: {used} | Expected: {expected} | {'✔' if correct else '✘'}")
+        for key, events in self.finger_stats.by_key().items():
+            for event in events:
+                print(f"Key: {key} | Used: {event.used} ({event.confidence:.0%}) | Expected: {event.expected} | {'✔' if event.correct else '✘'}")
         print("================================================\n")
+        print(self.latency.format_summary())
+
+    def save_latency_report(self):
+        path = self.latency.dump()
+        if path:
+            print(f"Latency report saved to {path}")
 
     def start_new_test(self):
         self.main_window.typing_test_screen.reset_test()
@@ -2,17 +2,19 @@ from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel
 from PyQt5.QtCore import Qt, QTimer
 import random
 import html
+import time
 
 from app.screens.finger_tracking_screen import FingerTrackingScreen
 from app.theme import apply_theme
-from app.util.config_manager import load_config
+from app.util.attribution import key_label_for_char
+from app.util.config_manager import get_setting
+from app.util.latency import get_latency_recorder
+from app.util.session_recorder import SessionRecorder, new_recording_path
+from app.util.keystroke_log import KeystrokeLog
+from app.util.layout_compiler import get_layout
+from app.util.session_store import SessionStore
 from app.assets.words import WORDS
 
-SHIFT_KEYS = {
-    "!": "1", "@": "2", "#": "3", "$": "4", "%": "5", "^": "6", "&": "7", "*": "8",
-    "(": "9", ")": "0", "_": "-", "+": "=", ":": ";", "\"": "'", "?": "/", "~": "`"
-}
-
 class TypingTestScreen(QWidget):
     def __init__(self, main_window):
         super().__init__()
@@ -30,10 +32,15 @@ class TypingTestScreen(QWidget):
         self.typed_words = []
         self.errors = []
         self.finished_words = []
-        self.finger_stats = {}
+        self.finger_stats = KeystrokeLog()
+        self.recorder = None
+        self.word_fragments = []
+        self.displayed_text = None
         self.total_keystrokes = 0
         self.incorrect_keystrokes = 0
-        self.correct_finger_map = load_config("technique") or {}
+        self.keyboard_layout = get_layout()
+        self.correct_finger_map = self.keyboard_layout.technique
+        self.latency = get_latency_recorder()
         self.current_word_index = 0
         self.timer = QTimer()
         self.elapsed = 0
@@ -67,16 +74,51 @@ class TypingTestScreen(QWidget):
         self.typed_words = ["" for _ in self.words]
         self.errors = [0 for _ in self.words]
         self.finished_words = [False for _ in self.words]
+        self.word_fragments = [None for _ in self.words]
         self.current_word_index = 0
         self.elapsed = 0
         self.total_keystrokes = 0
         self.incorrect_keystrokes = 0
-        self.finger_stats = {}
+        self.finger_stats = KeystrokeLog()
+        self.latency.reset()
+        self.start_recording()
         self.timer_label.setText("0")
         self.timer.stop()
         self.update_display()
         self.update_expected_finger_overlay()
 
+    def start_recording(self):
+        self.stop_recording()
+        if not get_setting("record_sessions", False):
+            return
+
+        self.recorder = SessionRecorder(new_recording_path(), record_frames=get_setting("record_frames", False))
+        self.recorder.record_meta({
+            "started": time.time(),
+            "words": self.words,
+            "keys": self.keyboard_layout.key_data,
+        })
+        self.finger_tracking_screen.tracker.recorder = self.recorder
+
+    def stop_recording(self):
+        if self.recorder is None:
+            return
+        self.finger_tracking_screen.tracker.recorder = None
+        self.recorder.close()
+        if self.recorder.dropped:
+            print(f"Session recording dropped {self.recorder.dropped} frames")
+        print(f"Session recorded to {self.recorder.path}")
+        self.recorder = None
+
+    def save_to_history(self, wpm, accuracy):
+        if not get_setting("save_history", True):
+            return
+        try:
+            SessionStore().append_session(self.finger_stats.columns(), wpm=wpm,
+                                          accuracy=accuracy, duration=self.elapsed / 1000)
+        except Exception as e:
+            print(f"Failed to save session history: {e}")
+
     def start_timer(self):
         self.timer.start(100)
 
@@ -89,6 +131,7 @@ class TypingTestScreen(QWidget):
         self.timer_label.setText(f"{seconds}s")
 
     def keyPressEvent(self, event):
+        pressed_at = time.monotonic()
         if not self.timer.isActive():
             self.elapsed = 100
             self.update_timer_display()
@@ -118,6 +161,8 @@ class TypingTestScreen(QWidget):
                     self.elapsed = 1
                 accuracy = self.calculate_accuracy()
                 wpm = self.calculate_wpm()
+                self.stop_recording()
+                self.save_to_history(wpm, accuracy)
                 self.main_window.show_result_screen(wpm, accuracy, self.finger_stats, self.elapsed)
                 return
             else:
@@ -130,28 +175,22 @@ class TypingTestScreen(QWidget):
             char = event.text()
             if char:
                 self.total_keystrokes += 1
-                base_key = SHIFT_KEYS.get(char, char)
-                print(f"Key pressed: {char} | Base key: {base_key}")
-                key_label = base_key.upper()
-                finger_used = self.finger_tracking_screen.get_finger_that_pressed_key(key_label)
+                key_label = key_label_for_char(char)
+                print(f"Key pressed: {char} | Base key: {key_label}")
+                with self.latency.span("attribution"):
+                    finger_used, confidence = self.finger_tracking_screen.attribute_key_press(key_label, pressed_at)
                 correct_finger = self.correct_finger_map.get(key_label)
-                is_correct = False
+                is_correct = self.keyboard_layout.is_expected_finger(key_label, finger_used)
 
                 if finger_used:
-                    if isinstance(correct_finger, list):
-                        is_correct = finger_used in correct_finger
-                    else:
-                        is_correct = finger_used == correct_finger
-                    print(f"[{'Correct' if is_correct else 'Incorrect'}] '{key_label}' - Used: {finger_used} | Expected: {correct_finger}")
+                    print(f"[{'Correct' if is_correct else 'Incorrect'}] '{key_label}' - Used: {finger_used} ({confidence:.0%}) | Expected: {correct_finger}")
                 else:
                     print(f"[Error] Could not detect finger for key '{key_label}'")
                     finger_used = "Unknown"
 
-                self.finger_stats.setdefault(key_label, []).append({
-                    "used": finger_used or "Unknown",
-                    "expected": correct_finger or "N/A",
-                    "correct": is_correct if finger_used else False
-                })
+                self.finger_stats.append(key_label, finger_used, correct_finger, is_correct, time.time(), confidence)
+                if self.recorder:
+                    self.recorder.record_keystroke(pressed_at, key_label, finger_used, correct_finger, is_correct)
 
                 word = self.words[self.current_word_index]
                 idx = len(current)
@@ -182,11 +221,15 @@ class TypingTestScreen(QWidget):
                 self.elapsed = 100
             accuracy = self.calculate_accuracy()
             wpm = self.calculate_wpm()
+            self.stop_recording()
+            self.save_to_history(wpm, accuracy)
             self.main_window.show_result_screen(wpm, accuracy, self.finger_stats, self.elapsed // 1000)
             return
 
-        self.update_display()
-        self.update_expected_finger_overlay()
+        with self.latency.span("render"):
+            self.update_display()
+            self.update_expected_finger_overlay()
+        self.latency.record_since("keystroke_to_feedback", pressed_at)
 
     def update_expected_finger_overlay(self):
         current_word = self.words[self.current_word_index]
@@ -196,15 +239,46 @@ class TypingTestScreen(QWidget):
         if idx == len(current_word):
             self.finger_tracking_screen.set_target_keys([" "])
         elif idx < len(current_word):
-            char = current_word[idx]
-            base_key = SHIFT_KEYS.get(char, char)
-            keys = [base_key.upper()]
-            if char in SHIFT_KEYS:
-                keys += ["Left Shift", "Right Shift"]
-            self.finger_tracking_screen.set_target_keys(keys)
+            self.finger_tracking_screen.set_target_keys(self.keyboard_layout.keys_for_char(current_word[idx]))
         else:
             self.finger_tracking_screen.set_target_keys(None)
 
+    def render_word(self, i):
+        # Fragments are cached per word and only rebuilt when that word's typed
+        # text or cursor changes, so a keystroke re-renders one or two words.
+        expected = self.words[i]
+        typed = self.typed_words[i]
+        cursor = len(typed) if i == self.current_word_index else -1
+        state = (typed, cursor)
+
+        cached = self.word_fragments[i]
+        if cached is not None and cached[0] == state:
+            return cached[1]
+
+        inner_spans = ""
+
+        for j in range(len(expected)):
+            char = html.escape(expected[j])
+            is_cursor = j == cursor
+
+            if j < len(typed):
+                style = "color:#F6FFF8;" if expected[j] == typed[j] else "color:red;"
+                if is_cursor:
+                    style += "border-bottom: 3px solid #FFD700;"
+                inner_spans += f'<span style="{style}">{char}</span>'
+            elif is_cursor:
+                inner_spans += f'<span style="border-bottom: 3px solid #FFD700;">{char}</span>'
+            else:
+                inner_spans += f'<span>{char}</span>'
+
+        if len(typed) > len(expected):
+            for char in typed[len(expected):][:10]:
+                inner_spans += f'<span style="color:red;">{html.escape(char)}</span>'
+
+        styled_word = f'<span style="margin-right: 14px;">{inner_spans}</span>&nbsp;'
+        self.word_fragments[i] = (state, styled_word)
+        return styled_word
+
     def update_display(self):
         words_per_line = 10
         max_lines = 3
@@ -214,43 +288,14 @@ class TypingTestScreen(QWidget):
         end_index = min(len(self.words), (start_line + max_lines) * words_per_line)
 
         lines = []
-        line = ""
-
-        for i in range(start_index, end_index):
-            expected = self.words[i]
-            typed = self.typed_words[i]
-            inner_spans = ""
-
-            for j in range(len(expected)):
-                char = html.escape(expected[j])
-                is_cursor = (i == self.current_word_index and j == len(typed))
-
-                if j < len(typed):
-                    style = "color:#F6FFF8;" if expected[j] == typed[j] else "color:red;"
-                    if is_cursor:
-                        style += "border-bottom: 3px solid #FFD700;"
-                    inner_spans += f'<span style="{style}">{char}</span>'
-                elif is_cursor:
-                    inner_spans += f'<span style="border-bottom: 3px solid #FFD700;">{char}</span>'
-                else:
-                    inner_spans += f'<span>{char}</span>'
-
-            if len(typed) > len(expected):
-                for char in typed[len(expected):][:10]:
-                    inner_spans += f'<span style="color:red;">{html.escape(char)}</span>'
-
-            styled_word = f'<span style="margin-right: 14px;">{inner_spans}</span>&nbsp;'
-            line += styled_word
-
-            if (i + 1 - start_index) % words_per_line == 0:
-                lines.append(line)
-                line = ""
-
-        if line:
-            lines.append(line)
+        for line_start in range(start_index, end_index, words_per_line):
+            line_end = min(line_start + words_per_line, end_index)
+            lines.append("".join(self.render_word(i) for i in range(line_start, line_end)))
 
         display = "<br>".join(lines)
-        self.text_label.setText(display)
+        if display != self.displayed_text:
+            self.displayed_text = display
+            self.text_label.setText(display)
 
     def calculate_accuracy(self):
         total_keypresses = self.total_keystrokes
@@ -0,0 +1,173 @@
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from app.util.keyboard_dataset import LetterboxCache, unletterbox
+from app.util.keyboard_detector import DEFAULT_WEIGHTS, KeyboardDetector, OnnxDetector, box_iou
+from app.util.latency import LatencyRecorder
+
+# Sweeps the keyboard detector over keyboard_dataset/images/val for each
+# export format, input size and batch size, and scores the top box of every
+# image against its label file:
+#   python -m app.tools.benchmark_detector --formats pytorch onnx openvino --imgsz 320 480 640 --batch 1 4
+# "onnxruntime" runs the ONNX export through the app's own OnnxDetector
+# backend instead of ultralytics.
+# Images are letterboxed once per size into the memmapped cache, so the
+# timings cover inference and post-processing only.
+
+FORMATS = ("pytorch", "onnx", "openvino", "onnxruntime")
+IOU_THRESHOLD = 0.5
+
+
+def load_model(weights, fmt, imgsz, exports):
+    # ultralytics runs its own exports too. Exports go wherever ultralytics
+    # writes them and are loaded from the path it returns; exports holds them
+    # per (format, size) so onnx and onnxruntime share one.
+    from ultralytics import YOLO
+
+    if fmt == "pytorch":
+        return YOLO(weights)
+
+    export_format = "openvino" if fmt == "openvino" else "onnx"
+    exported = exports.get((export_format, imgsz))
+    if exported is None:
+        exported = YOLO(weights).export(format=export_format, imgsz=imgsz, dynamic=True)
+        exports[(export_format, imgsz)] = exported
+
+    if fmt == "onnxruntime":
+        return OnnxDetector(exported, imgsz=imgsz, warmup_shape=(imgsz, imgsz))
+    return YOLO(exported, task="detect")
+
+
+def predict_boxes(model, images, imgsz, conf):
+    # [(N, 5) letterboxed x1, y1, x2, y2, score per image]
+    if isinstance(model, KeyboardDetector):
+        # Inputs are already imgsz squares, so the detector's own letterbox
+        # leaves the coordinates unchanged.
+        return [np.array(boxes, dtype=np.float32).reshape(-1, 5) for boxes in model.detect_batch(images, conf)]
+    results = model.predict(list(images), imgsz=imgsz, conf=conf, device="cpu", verbose=False)
+    return [
+        np.concatenate([r.boxes.xyxy.cpu().numpy(), r.boxes.conf.cpu().numpy()[:, None]], axis=1)
+        for r in results
+    ]
+
+
+def top_box_iou(cache, i, boxes):
+    # IoU between the highest-scoring prediction and the best matching label.
+    labels = cache.label_boxes(i)
+    if not len(boxes) or not len(labels):
+        return 0.0
+    entry = cache.entry(i)
+    top = unletterbox(boxes[np.argmax(boxes[:, 4]), :4], entry["scale"], entry["pad"])
+    return float(box_iou(top, labels).max())
+
+
+def run_config(model, cache, batch, conf_thresholds, warmup=1):
+    latency = LatencyRecorder()
+    size = cache.size
+    low_conf = min(conf_thresholds)
+    predictions = []
+
+    for _ in range(warmup):
+        predict_boxes(model, np.ascontiguousarray(cache.images[:batch]), size, low_conf)
+
+    start = time.perf_counter()
+    for first in range(0, len(cache), batch):
+        images = np.ascontiguousarray(cache.images[first:first + batch])
+        batch_start = time.perf_counter()
+        predictions.extend(predict_boxes(model, images, size, low_conf))
+        latency.record("batch", time.perf_counter() - batch_start)
+    elapsed = time.perf_counter() - start
+
+    # One pass at the lowest threshold; higher thresholds only filter boxes.
+    accuracy = {}
+    for conf in conf_thresholds:
+        ious = np.array([top_box_iou(cache, i, boxes[boxes[:, 4] >= conf]) for i, boxes in enumerate(predictions)])
+        accuracy[str(conf)] = {
+            "mean_iou": float(ious.mean()) if ious.size else 0.0,
+            "recall": float((ious >= IOU_THRESHOLD).mean()) if ious.size else 0.0,
+        }
+
+    return {
+        "images": len(cache),
+        "images_per_second": len(cache) / elapsed if elapsed else 0.0,
+        "batch_latency_ms": latency.summary().get("batch", {}),
+        "accuracy": accuracy,
+    }
+
+
+def run_benchmark(weights, formats, sizes, batches, conf_thresholds):
+    results = []
+    exports = {}
+    for size in sizes:
+        cache = LetterboxCache("val", size)
+        for fmt in formats:
+            try:
+                model = load_model(weights, fmt, size, exports)
+            except Exception as e:
+                print(f"Skipping {fmt} @ {size}px: {e}")
+                continue
+            for batch in batches:
+                result = run_config(model, cache, batch, conf_thresholds)
+                result.update({"format": fmt, "imgsz": size, "batch": batch})
+                results.append(result)
+                print_result(result)
+    return results
+
+
+def print_result(result):
+    latency = result["batch_latency_ms"]
+    accuracy = ", ".join(
+        f"conf {conf}: IoU {stats['mean_iou']:.2f} / recall {stats['recall'] * 100:.0f}%"
+        for conf, stats in result["accuracy"].items()
+    )
+    print(f"{result['format']:<9}{result['imgsz']:>5}px  batch {result['batch']:<3}"
+          f"{result['images_per_second']:>7.1f} img/s  "
+          f"p50 {latency.get('p50', 0):.1f}ms p95 {latency.get('p95', 0):.1f}ms p99 {latency.get('p99', 0):.1f}ms  "
+          f"{accuracy}")
+
+
+def fastest_accurate(results, min_recall):
+    # Fastest (result, conf) whose top-box recall still meets min_recall.
+    candidates = [
+        (result, conf) for result in results
+        for conf, stats in result["accuracy"].items() if stats["recall"] >= min_recall
+    ]
+    return max(candidates, key=lambda c: c[0]["images_per_second"], default=None)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark keyboard detector speed and accuracy on the val split.")
+    parser.add_argument("--weights", default=DEFAULT_WEIGHTS)
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=["pytorch", "onnx"])
+    parser.add_argument("--imgsz", nargs="+", type=int, default=[320, 480, 640])
+    parser.add_argument("--batch", nargs="+", type=int, default=[1, 4])
+    parser.add_argument("--conf", nargs="+", type=float, default=[0.25, 0.5])
+    parser.add_argument("--min-recall", type=float, default=0.9,
+                        help="Recall at IoU 0.5 a setting needs to be recommended")
+    parser.add_argument("--output", help="Write all results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.weights, args.formats, args.imgsz, args.batch, args.conf)
+    if not results:
+        return 1
+
+    best = fastest_accurate(results, args.min_recall)
+    if best:
+        result, conf = best
+        print(f"\nFastest with recall >= {args.min_recall * 100:.0f}%: {result['format']} @ {result['imgsz']}px, "
+              f"batch {result['batch']}, conf {conf} ({result['images_per_second']:.1f} img/s)")
+    else:
+        print(f"\nNo setting reached {args.min_recall * 100:.0f}% recall.")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
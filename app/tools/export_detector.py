@@ -0,0 +1,64 @@
+import argparse
+import json
+import os
+import sys
+
+from app.util.keyboard_dataset import resolve_dataset_yaml
+from app.util.keyboard_detector import DEFAULT_WEIGHTS
+
+# Exports the trained keyboard detector for the onnx and openvino detector
+# backends, optionally with INT8 weights:
+#   python -m app.tools.export_detector --formats onnx openvino --int8
+# and prints the settings.json entries that select the export.
+
+
+def export_onnx(weights, imgsz=640, int8=False):
+    from ultralytics import YOLO
+
+    path = YOLO(weights).export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+    if not int8:
+        return path
+
+    # Dynamic quantisation needs no calibration data: weights are stored as
+    # INT8 and activations are quantised on the fly at run time.
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    int8_path = os.path.splitext(path)[0] + "_int8.onnx"
+    quantize_dynamic(path, int8_path, weight_type=QuantType.QUInt8)
+    return int8_path
+
+
+def export_openvino(weights, imgsz=640, int8=False):
+    from ultralytics import YOLO
+
+    # OpenVINO INT8 uses post-training quantisation (NNCF), calibrated on the
+    # dataset's images. ultralytics writes it to its own *_int8_openvino_model
+    # directory.
+    options = {"int8": True, "data": resolve_dataset_yaml()} if int8 else {}
+    return YOLO(weights).export(format="openvino", imgsz=imgsz, dynamic=True, **options)
+
+
+EXPORTERS = {
+    "onnx": export_onnx,
+    "openvino": export_openvino,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the keyboard detector for the ONNX Runtime/OpenVINO backends.")
+    parser.add_argument("--weights", default=DEFAULT_WEIGHTS)
+    parser.add_argument("--formats", nargs="+", choices=list(EXPORTERS), default=["onnx"])
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--int8", action="store_true", help="Quantise weights to INT8")
+    args = parser.parse_args(argv)
+
+    for fmt in args.formats:
+        path = EXPORTERS[fmt](args.weights, args.imgsz, args.int8)
+        settings = {"detector_backend": fmt, "detector_weights": path, "detector_imgsz": args.imgsz}
+        print(f"\nExported {fmt} model to {path}. To use it, add to app/assets/settings.json:")
+        print(json.dumps(settings, indent=4))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
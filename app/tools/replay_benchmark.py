@@ -0,0 +1,146 @@
+import argparse
+import json
+import sys
+import time
+
+import cv2
+
+from app.util.attribution import attribute_keystroke, is_correct_finger, key_label_for_char
+from app.util.key_layout import KeyLayout
+from app.util.landmark_buffer import LandmarkRingBuffer
+from app.util.landmarks import HandLandmarker
+from app.util.layout_compiler import get_layout
+from app.util.latency import LatencyRecorder
+
+# Replays a recorded webcam video and a keystroke log through the same
+# landmark buffer and attribution code the app uses, without a camera or a
+# display. The keystroke log is JSON lines, one key per line:
+#   {"t": 3.412, "char": "a", "finger": "Left Pinky"}
+# "t" is seconds from the start of the video, "key" may be given instead of
+# "char", and "finger" is optional ground truth for attribution accuracy.
+
+
+def load_keystrokes(path):
+    keystrokes = []
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            key_label = entry.get("key") or key_label_for_char(entry["char"])
+            keystrokes.append((float(entry["t"]), key_label, entry.get("finger")))
+    return sorted(keystrokes, key=lambda k: k[0])
+
+
+def run_replay(video_path, keystrokes, key_data, technique_map, history_size=64, max_frames=None):
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Could not open video '{video_path}'")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+
+    key_layout = KeyLayout(key_data)
+    history = LandmarkRingBuffer(history_size)
+    latency = LatencyRecorder()
+    landmarker = HandLandmarker.from_settings(key_layout)
+    attributions = []
+    pending = 0
+    frames = 0
+
+    def attribute_until(timestamp):
+        nonlocal pending
+        while pending < len(keystrokes) and keystrokes[pending][0] <= timestamp:
+            t, key_label, true_finger = keystrokes[pending]
+            with latency.span("attribution"):
+                finger, confidence = attribute_keystroke(history, key_layout, key_label, t)
+            attributions.append((t, key_label, finger, true_finger, confidence))
+            pending += 1
+
+    start = time.perf_counter()
+    try:
+        while max_frames is None or frames < max_frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            timestamp = frames / fps
+
+            with latency.span("inference"):
+                landmarks = landmarker.process(frame, timestamp)
+            history.push(timestamp, landmarks)
+            frames += 1
+
+            attribute_until(timestamp)
+        attribute_until(float("inf"))
+    finally:
+        landmarker.close()
+        cap.release()
+    elapsed = time.perf_counter() - start
+
+    return build_report(frames, elapsed, latency, attributions, technique_map)
+
+
+def build_report(frames, elapsed, latency, attributions, technique_map):
+    detected = [a for a in attributions if a[2]]
+    technique_correct = sum(is_correct_finger(finger, technique_map.get(key)) for _, key, finger, _, _ in attributions)
+    labelled = [a for a in attributions if a[3]]
+    labelled_correct = sum(finger == true_finger for _, _, finger, true_finger, _ in labelled)
+
+    return {
+        "frames": frames,
+        "seconds": elapsed,
+        "frames_per_second": frames / elapsed if elapsed else 0.0,
+        "keystrokes": len(attributions),
+        "detection_rate": len(detected) / len(attributions) if attributions else 0.0,
+        "technique_accuracy": technique_correct / len(attributions) * 100 if attributions else 0.0,
+        "attribution_accuracy": labelled_correct / len(labelled) * 100 if labelled else None,
+        "mean_confidence": sum(a[4] for a in detected) / len(detected) if detected else 0.0,
+        "latency_ms": latency.summary(),
+    }
+
+
+def print_report(report):
+    print("\n====== Replay Benchmark ======")
+    print(f"Frames: {report['frames']} in {report['seconds']:.2f}s ({report['frames_per_second']:.1f} fps)")
+    print(f"Keystrokes: {report['keystrokes']} | Detected: {report['detection_rate'] * 100:.1f}%")
+    print(f"Technique accuracy: {report['technique_accuracy']:.1f}%")
+    print(f"Mean attribution confidence: {report['mean_confidence'] * 100:.1f}%")
+    if report["attribution_accuracy"] is not None:
+        print(f"Attribution accuracy vs labels: {report['attribution_accuracy']:.1f}%")
+    for stage, stats in report["latency_ms"].items():
+        print(f"{stage:<14} p50 {stats['p50']:.2f}ms | p95 {stats['p95']:.2f}ms | p99 {stats['p99']:.2f}ms")
+    print("==============================\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a recorded typing session headlessly and benchmark attribution.")
+    parser.add_argument("video", help="Recorded webcam video")
+    parser.add_argument("keystrokes", help="JSON lines keystroke log")
+    parser.add_argument("--keys", help="keys.json layout to use (defaults to the app's)")
+    parser.add_argument("--technique", help="technique.json to score against (defaults to the app's)")
+    parser.add_argument("--max-frames", type=int)
+    parser.add_argument("--output", help="Write the report as JSON to this path")
+    args = parser.parse_args(argv)
+
+    key_data = load_json(args.keys) if args.keys else get_layout().key_data
+    technique_map = load_json(args.technique) if args.technique else get_layout().technique
+    if not key_data:
+        print("No key layout available; map the keyboard first or pass --keys.")
+        return 1
+
+    report = run_replay(args.video, load_keystrokes(args.keystrokes), key_data, technique_map,
+                        max_frames=args.max_frames)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=4)
+    return 0
+
+
+def load_json(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from app.util.keyboard_dataset import RUNS_DIR, LetterboxCache, resolve_dataset_yaml
+from app.util.keyboard_detector import DEFAULT_WEIGHTS
+from app.util.latency import LatencyRecorder
+
+# Trains and evaluates the keyboard detector on keyboard_dataset/ from any
+# checkout: keyboard.yaml's hard-coded dataset path is rewritten to the one
+# inside the repo. Runs on the CPU by default, with a fixed seed.
+#   python -m app.tools.train_detector train --epochs 50
+#   python -m app.tools.train_detector eval --weights runs/detect/train/weights/best.pt
+
+BASE_MODEL = "yolov8n.pt"
+DETECT_DIR = os.path.join(RUNS_DIR, "detect")
+
+
+def train(base_model=BASE_MODEL, epochs=50, imgsz=640, batch=8, workers=2, device="cpu", seed=0):
+    from ultralytics import YOLO
+
+    # ultralytics' own "disk" cache stores each decoded, resized training
+    # image as .npy next to the JPEG, so epochs after the first skip decoding.
+    model = YOLO(base_model)
+    model.train(
+        data=resolve_dataset_yaml(),
+        epochs=epochs,
+        imgsz=imgsz,
+        batch=batch,
+        workers=workers,
+        device=device,
+        cache="disk",
+        seed=seed,
+        deterministic=True,
+        project=DETECT_DIR,
+        name="train",
+        exist_ok=True,
+    )
+    return os.path.join(DETECT_DIR, "train", "weights", "best.pt")
+
+
+def evaluate(weights=DEFAULT_WEIGHTS, imgsz=640, batch=8, device="cpu", conf=0.25):
+    from ultralytics import YOLO
+
+    model = YOLO(weights)
+    metrics = model.val(
+        data=resolve_dataset_yaml(),
+        split="val",
+        imgsz=imgsz,
+        batch=batch,
+        device=device,
+        plots=False,
+        project=DETECT_DIR,
+        name="val",
+        exist_ok=True,
+        verbose=False,
+    )
+
+    return {
+        "weights": weights,
+        "imgsz": imgsz,
+        "map50": float(metrics.box.map50),
+        "map50_95": float(metrics.box.map),
+        "val_speed_ms": {stage: float(ms) for stage, ms in metrics.speed.items()},
+        "inference_ms": time_inference(model, imgsz, device, conf),
+    }
+
+
+def time_inference(model, imgsz, device="cpu", conf=0.25, warmup=2):
+    # Single-image latency over the val split. Images come from the memmapped
+    # letterbox cache, so the timings exclude JPEG decoding and resizing.
+    cache = LetterboxCache("val", imgsz)
+    latency = LatencyRecorder()
+    for i in range(len(cache)):
+        image = np.ascontiguousarray(cache.images[i])
+        if i < warmup:
+            model.predict(image, imgsz=imgsz, conf=conf, device=device, verbose=False)
+        start = time.perf_counter()
+        model.predict(image, imgsz=imgsz, conf=conf, device=device, verbose=False)
+        latency.record("inference", time.perf_counter() - start)
+    return latency.summary().get("inference", {})
+
+
+def print_report(report):
+    print("\n====== Keyboard Detector ======")
+    print(f"Weights: {report['weights']} @ {report['imgsz']}px")
+    print(f"mAP50: {report['map50']:.3f} | mAP50-95: {report['map50_95']:.3f}")
+    stats = report["inference_ms"]
+    if stats:
+        print(f"Per-image inference ({stats['count']} images): mean {stats['mean']:.1f}ms | "
+              f"p50 {stats['p50']:.1f}ms | p95 {stats['p95']:.1f}ms")
+    print("===============================\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train or evaluate the keyboard detector on keyboard_dataset/.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = commands.add_parser("train", help="Train, then evaluate the best weights")
+    train_parser.add_argument("--model", default=BASE_MODEL, help="Base weights or model yaml to start from")
+    train_parser.add_argument("--epochs", type=int, default=50)
+    train_parser.add_argument("--workers", type=int, default=2)
+    train_parser.add_argument("--seed", type=int, default=0)
+
+    eval_parser = commands.add_parser("eval", help="Evaluate existing weights on the val split")
+    eval_parser.add_argument("--weights", default=DEFAULT_WEIGHTS)
+
+    for command in (train_parser, eval_parser):
+        command.add_argument("--imgsz", type=int, default=640)
+        command.add_argument("--batch", type=int, default=8)
+        command.add_argument("--device", default="cpu")
+        command.add_argument("--output", help="Write the evaluation report as JSON to this path")
+    args = parser.parse_args(argv)
+
+    if args.command == "train":
+        weights = train(args.model, args.epochs, args.imgsz, args.batch, args.workers, args.device, args.seed)
+    else:
+        weights = args.weights
+
+    report = evaluate(weights, args.imgsz, args.batch, args.device)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=4)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+from collections import namedtuple
+
+import numpy as np
+
+from app.util.key_layout import FINGERTIP_LABELS, fingertips
+from app.util.landmarks import visible_hands
+
+SHIFT_KEYS = {
+    "!": "1", "@": "2", "#": "3", "$": "4", "%": "5", "^": "6", "&": "7", "*": "8",
+    "(": "9", ")": "0", "_": "-", "+": "=", ":": ";", "\"": "'", "?": "/", "~": "`"
+}
+
+ATTRIBUTION_MAX_GAP = 0.15
+# A press shows up as tip motion shortly before the key event arrives.
+STRIKE_WINDOW = (0.2, 0.05)
+# Proximity falls off over this many key widths from the key center.
+PROXIMITY_SCALE = 1.0
+# Weight a fingertip keeps when it shows no strike motion at all, so
+# proximity alone still decides when nothing moved.
+STRIKE_FLOOR = 0.25
+
+Attribution = namedtuple("Attribution", ["finger", "confidence"])
+
+
+def key_label_for_char(char):
+    return SHIFT_KEYS.get(char, char).upper()
+
+
+def attribute_keystroke(history, key_layout, key_label, timestamp, max_gap=ATTRIBUTION_MAX_GAP):
+    # Scores every fingertip by its proximity to the key in the buffered frame
+    # nearest the keystroke, weighted by how hard it struck around that time.
+    # Returns Attribution(finger, confidence), confidence being the winner's
+    # share of the total score; finger is None if no hand was visible.
+    if key_label not in key_layout:
+        return Attribution(None, 0.0)
+
+    for _, hands in history.closest(timestamp, max_gap):
+        if visible_hands(hands):
+            break
+    else:
+        return Attribution(None, 0.0)
+
+    key = key_layout.index[key_label]
+    x1, y1, x2, y2 = key_layout.boxes[key]
+    distances = key_layout.distances_to_keys(fingertips(hands), [key])[:, 0]
+    proximity = np.exp(-0.5 * (distances / (PROXIMITY_SCALE * max(x2 - x1, y2 - y1, 1))) ** 2)
+
+    strikes = history.peak_strikes(timestamp - STRIKE_WINDOW[0], timestamp + STRIKE_WINDOW[1])
+    scores = np.nan_to_num(proximity * (STRIKE_FLOOR + strikes))
+
+    best = int(np.argmax(scores))
+    total = scores.sum()
+    if total <= 0:
+        # Every visible tip is far from the key; fall back to plain distance.
+        finger = key_layout.closest_finger(hands, key_label)
+        return Attribution(finger, 0.0)
+    return Attribution(FINGERTIP_LABELS[best], float(scores[best] / total))
+
+
+def is_correct_finger(finger_used, correct_finger):
+    if not finger_used:
+        return False
+    if isinstance(correct_finger, list):
+        return finger_used in correct_finger
+    return finger_used == correct_finger
@@ -0,0 +1,160 @@
+import sys
+import threading
+import time
+
+from PyQt5.QtCore import QCoreApplication, QObject, pyqtSignal
+import cv2
+
+from app.util import startup_timer
+from app.util.latency import get_latency_recorder
+
+
+class LatestValue:
+    # Single-writer "latest value" slot. The sequence number and value are
+    # published together as one tuple, so readers never need a lock and
+    # never see a half-updated entry.
+    def __init__(self):
+        self._entry = (0, None)
+
+    def set(self, value):
+        self._entry = (self._entry[0] + 1, value)
+
+    def get(self):
+        return self._entry
+
+
+class CameraService(QObject):
+    # Owns the webcam for the whole app. Screens acquire()/release() it instead
+    # of opening their own VideoCapture; the device stays open for a short
+    # grace period after the last release so switching screens doesn't reopen
+    # it. Frames are published read-only and shared by every subscriber, so
+    # anyone who wants to draw on a frame must copy it first.
+    frame_ready = pyqtSignal()
+
+    def __init__(self, index=0, width=1280, height=720, release_delay=2.0):
+        super().__init__()
+        self.index = index
+        self.width = width
+        self.height = height
+        self.release_delay = release_delay
+        self.latest = LatestValue()
+
+        self._refs = 0
+        self._thread = None
+        self._closing_thread = None
+        self._stop_event = None
+        self._release_timer = None
+        self._subscribers = []
+        self._frame_cond = threading.Condition()
+
+    def acquire(self):
+        with self._frame_cond:
+            self._refs += 1
+            if self._release_timer:
+                self._release_timer.cancel()
+                self._release_timer = None
+            if self._thread is None:
+                self._stop_event = threading.Event()
+                self._thread = threading.Thread(
+                    target=self._run, args=(self._stop_event, self._closing_thread), daemon=True
+                )
+                self._thread.start()
+
+    def release(self):
+        with self._frame_cond:
+            if self._refs == 0:
+                return
+            self._refs -= 1
+            if self._refs == 0 and self._thread is not None:
+                self._release_timer = threading.Timer(self.release_delay, self._close_if_unused)
+                self._release_timer.daemon = True
+                self._release_timer.start()
+
+    def shutdown(self):
+        with self._frame_cond:
+            self._refs = 0
+            if self._release_timer:
+                self._release_timer.cancel()
+                self._release_timer = None
+        self._close_if_unused()
+
+    def is_active(self):
+        return self._thread is not None
+
+    def subscribe(self, callback):
+        # callback(timestamp, frame) runs on the capture thread and must be quick.
+        if callback not in self._subscribers:
+            self._subscribers = self._subscribers + [callback]
+
+    def unsubscribe(self, callback):
+        self._subscribers = [cb for cb in self._subscribers if cb != callback]
+
+    def wait_for_frame(self, after_seq=0, timeout=None):
+        with self._frame_cond:
+            self._frame_cond.wait_for(lambda: self.latest.get()[0] > after_seq, timeout)
+        return self.latest.get()
+
+    def _close_if_unused(self):
+        with self._frame_cond:
+            if self._refs > 0 or self._thread is None:
+                return
+            thread, self._thread = self._thread, None
+            self._closing_thread = thread
+            self._stop_event.set()
+            self._release_timer = None
+        thread.join()
+
+    def _run(self, stop_event, previous_thread):
+        # A capture thread that is still shutting down may hold the device.
+        if previous_thread is not None:
+            previous_thread.join()
+
+        backend = cv2.CAP_DSHOW if sys.platform == "win32" else cv2.CAP_ANY
+        cap = cv2.VideoCapture(self.index, backend)
+        if not cap.isOpened():
+            print(f"Failed to open webcam {self.index}")
+            cap.release()
+            with self._frame_cond:
+                # Let the next acquire() try the device again.
+                if self._thread is threading.current_thread():
+                    self._thread = None
+            return
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        startup_timer.mark("camera opened")
+        latency = get_latency_recorder()
+
+        try:
+            while not stop_event.is_set():
+                read_start = time.monotonic()
+                ret, frame = cap.read()
+                if not ret or frame is None:
+                    time.sleep(0.01)
+                    continue
+                timestamp = time.monotonic()
+                latency.record("capture", timestamp - read_start)
+                frame.setflags(write=False)
+
+                with self._frame_cond:
+                    self.latest.set((timestamp, frame))
+                    self._frame_cond.notify_all()
+
+                for callback in self._subscribers:
+                    callback(timestamp, frame)
+                self.frame_ready.emit()
+        finally:
+            cap.release()
+            self.latest.set(None)
+
+
+_camera = None
+
+
+def get_camera():
+    global _camera
+    if _camera is None:
+        _camera = CameraService()
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(_camera.shutdown)
+    return _camera
@@ -1,40 +1,206 @@
+import atexit
+import copy
 import os
 import json
+import tempfile
+import threading
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 CONFIG_PATHS = {
     "keys": os.path.join(BASE_DIR, "assets", "keys.json"),
     "technique": os.path.join(BASE_DIR, "assets", "technique.json"),
-    "keymap": os.path.join(BASE_DIR, "assets", "keymap.json")
+    "keymap": os.path.join(BASE_DIR, "assets", "keymap.json"),
+    "settings": os.path.join(BASE_DIR, "assets", "settings.json")
 }
 
-def config_exists(which):
-    path = CONFIG_PATHS.get(which)
-    return path and os.path.exists(path) and os.path.getsize(path) > 0
+# Saves within this many seconds of each other are written to disk together.
+WRITE_DELAY = 0.5
 
-def load_config(name):
-    path = CONFIG_PATHS.get(name)
-    if path and config_exists(name):
+
+def _file_stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class ConfigStore:
+    # In-memory cache over the JSON config files. A load costs one stat() to
+    # notice edits made outside the app; saves update the cache and notify
+    # subscribers immediately, then reach disk in one debounced batch via a
+    # temp file + os.replace, so a crash mid-write leaves the old file intact.
+    def __init__(self, paths=CONFIG_PATHS, write_delay=WRITE_DELAY):
+        self.paths = paths
+        self.write_delay = write_delay
+        self._cache = {}
+        self._pending = {}
+        self._saves = 0
+        self._subscribers = {}
+        self._timer = None
+        self._lock = threading.RLock()
+
+    def _read(self, name):
+        # Cached data for name ({} if missing or unreadable), re-read only when
+        # the file's mtime or size changed. Callers must not mutate the result.
+        with self._lock:
+            if name in self._pending:
+                return self._pending[name][0]
+
+            path = self.paths[name]
+            stamp = _file_stamp(path)
+            cached = self._cache.get(name)
+            if cached is not None and cached[0] == stamp:
+                return cached[1]
+
+            data = {}
+            if stamp is not None and stamp[1] > 0:
+                try:
+                    with open(path, "r") as f:
+                        data = json.load(f)
+                except Exception as e:
+                    print(f"Failed to load config '{name}': {e}")
+            self._cache[name] = (stamp, data)
+            return data
+
+    def exists(self, name):
+        if name not in self.paths:
+            return False
+        with self._lock:
+            if name in self._pending:
+                return True
+        stamp = _file_stamp(self.paths[name])
+        return stamp is not None and stamp[1] > 0
+
+    def stamp(self, name):
+        # Identifies name's current contents without reading them: the file's
+        # [mtime_ns, size], ["pending", n] while save n is waiting to be
+        # written, or None if there is no file.
+        with self._lock:
+            if name in self._pending:
+                return ["pending", self._pending[name][2]]
+        stamp = _file_stamp(self.paths[name])
+        return list(stamp) if stamp is not None else None
+
+    def load(self, name):
+        if not self.exists(name):
+            print(f"Config '{name}' not found or empty.")
+            return {}
+        return copy.deepcopy(self._read(name))
+
+    def get(self, name, key, default=None):
+        if name not in self.paths:
+            return default
+        return self._read(name).get(key, default)
+
+    def save(self, name, data):
+        if name not in self.paths:
+            print(f"Unknown config name: {name}")
+            return False
+
+        # Serialised here so unsavable data fails the call, not the timer.
+        try:
+            text = json.dumps(data, indent=4)
+        except (TypeError, ValueError) as e:
+            print(f"Failed to save config '{name}': {e}")
+            return False
+
+        data = json.loads(text)
+        with self._lock:
+            self._saves += 1
+            self._pending[name] = (data, text, self._saves)
+            if self._timer is None:
+                self._timer = threading.Timer(self.write_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+        for callback in list(self._subscribers.get(name, ())):
+            try:
+                callback(name, data)
+            except Exception as e:
+                print(f"Config subscriber for '{name}' failed: {e}")
+        return True
+
+    def flush(self, names=None):
+        # Writes pending saves (all of them, or just names) to disk now.
+        with self._lock:
+            if names is None:
+                names = list(self._pending)
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            ok = True
+            for name in names:
+                if name not in self._pending:
+                    continue
+                entry = self._pending.pop(name)
+                if not self._write(name, *entry[:2]):
+                    # Keep serving the change from memory; the next flush retries.
+                    self._pending.setdefault(name, entry)
+                    ok = False
+            return ok
+
+    def _write(self, name, data, text):
+        path = self.paths[name]
+        directory = os.path.dirname(path)
+        tmp_path = None
         try:
-            with open(path, "r") as f:
-                return json.load(f)
+            os.makedirs(directory, exist_ok=True)
+            with tempfile.NamedTemporaryFile("w", dir=directory, prefix=f".{name}.", suffix=".tmp", delete=False) as f:
+                tmp_path = f.name
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
         except Exception as e:
-            print(f"Failed to load config '{name}': {e}")
-    else:
-        print(f"Config '{name}' not found or empty.")
-    return {}
+            print(f"Failed to save config '{name}': {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
 
-def save_config(name, data):
-    path = CONFIG_PATHS.get(name)
-    if not path:
-        print(f"Unknown config name: {name}")
-        return False
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    try:
-        with open(path, "w") as f:
-            json.dump(data, f, indent=4)
+        self._cache[name] = (_file_stamp(path), data)
         return True
-    except Exception as e:
-        print(f"Failed to save config '{name}': {e}")
-        return False
+
+    def subscribe(self, name, callback):
+        # callback(name, data) runs on the saving thread after every save.
+        with self._lock:
+            self._subscribers.setdefault(name, []).append(callback)
+
+    def unsubscribe(self, name, callback):
+        with self._lock:
+            callbacks = self._subscribers.get(name, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+
+_store = ConfigStore()
+atexit.register(_store.flush)
+
+
+def get_config_store():
+    return _store
+
+def config_exists(which):
+    return _store.exists(which)
+
+def load_config(name):
+    return _store.load(name)
+
+def get_setting(name, default=None):
+    return _store.get("settings", name, default)
+
+def save_config(name, data):
+    return _store.save(name, data)
+
+def config_stamp(name):
+    return _store.stamp(name)
+
+def flush_config(*names):
+    return _store.flush(list(names) if names else None)
+
+def subscribe_config(name, callback):
+    _store.subscribe(name, callback)
+
+def unsubscribe_config(name, callback):
+    _store.unsubscribe(name, callback)
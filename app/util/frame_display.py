@@ -0,0 +1,55 @@
+import cv2
+import numpy as np
+from PyQt5 import sip
+from PyQt5.QtGui import QImage, QPixmap
+
+
+def opaque(color):
+    # A BGR colour as BGRA for drawing on FrameDisplay buffers. cv2 fills a
+    # missing 4th component with 0, and Format_RGB32 needs alpha 0xff.
+    return (*color[:3], 255)
+
+
+class FrameDisplay:
+    # Turns BGR camera frames into QPixmaps with one conversion per frame.
+    # Frames are expanded into a reused BGRA buffer, which is byte-for-byte
+    # QImage.Format_RGB32 (Qt's native raster format), so QPixmap.fromImage
+    # wraps the buffer instead of converting and copying it again.
+    # Format_BGR888 looks cheaper but Qt converts it to RGB32 on every
+    # fromImage, which measured several times slower at 1280x720.
+    #
+    # Draw on the buffer with opaque() colours so the alpha byte stays 0xff.
+    #
+    # The buffer is shared with the last pixmap handed out: load() overwrites
+    # what that pixmap shows, so take pixmap().copy() to keep a frame.
+    def __init__(self):
+        self.canvas = None
+        self._retired = None
+
+    def load(self, frame):
+        # Copies a BGR frame into the display buffer and returns the buffer
+        # for cv2 drawing; image() wraps the same memory for QPainter.
+        h, w = frame.shape[:2]
+        if self.canvas is None or self.canvas.shape[:2] != (h, w):
+            # The previous pixmap may still be on screen until the caller
+            # replaces it, so keep its memory alive for one more frame.
+            self._retired = self.canvas
+            self.canvas = np.empty((h, w, 4), dtype=np.uint8)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2BGRA, dst=self.canvas)
+        return self.canvas
+
+    def image(self):
+        # A fresh wrapper per call: painting on a QImage that a pixmap still
+        # shares would detach it into a private copy instead of the buffer.
+        # A raw pointer selects Qt's writable-buffer constructor; a Python
+        # buffer is treated as read-only and also copied on paint. Keep the
+        # returned image referenced while a QPainter is open on it.
+        h, w = self.canvas.shape[:2]
+        return QImage(sip.voidptr(self.canvas.ctypes.data), w, h, self.canvas.strides[0], QImage.Format_RGB32)
+
+    def pixmap(self):
+        return QPixmap.fromImage(self.image())
+
+    def to_pixmap(self, frame):
+        self.load(frame)
+        return self.pixmap()
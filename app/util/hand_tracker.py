@@ -0,0 +1,67 @@
+from collections import namedtuple
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from app.util.camera_service import LatestValue, get_camera
+from app.util.latency import get_latency_recorder
+from app.util.landmark_buffer import LandmarkRingBuffer
+from app.util.landmarks import HandLandmarker
+
+# keys is the KeyLayout index under each fingertip (FINGERTIP_LABELS order, -1
+# for none), or None when the worker has no layout.
+TrackingResult = namedtuple("TrackingResult", ["timestamp", "frame", "hands", "keys"])
+
+
+class HandTrackingWorker(QThread):
+    result_ready = pyqtSignal()
+
+    def __init__(self, key_layout=None, history_size=64):
+        super().__init__()
+        self.key_layout = key_layout
+        self.camera = get_camera()
+        self.latest = LatestValue()
+        self.history = LandmarkRingBuffer(history_size)
+        self.processed_seq = 0
+        self.recorder = None
+        self._running = False
+
+    def start(self, *args, **kwargs):
+        self._running = True
+        super().start(*args, **kwargs)
+
+    def stop(self):
+        self._running = False
+        self.wait()
+
+    def run(self):
+        self.camera.acquire()
+        latency = get_latency_recorder()
+        landmarker = HandLandmarker.from_settings(self.key_layout)
+        seq = 0
+
+        try:
+            while self._running:
+                # Always jump to the newest frame; frames that arrived while
+                # the previous one was being processed are dropped.
+                seq, entry = self.camera.wait_for_frame(seq, timeout=0.1)
+                if entry is None or seq == self.processed_seq:
+                    continue
+                self.processed_seq = seq
+                timestamp, frame = entry
+
+                with latency.span("inference"):
+                    landmarks = landmarker.process(frame, timestamp)
+
+                self.history.push(timestamp, landmarks)
+                latency.record_since("capture_to_landmarks", timestamp)
+                keys = self.key_layout.keys_under_fingertips(landmarks) if self.key_layout is not None else None
+
+                recorder = self.recorder
+                if recorder is not None:
+                    recorder.record_landmarks(timestamp, landmarks)
+                    recorder.record_frame(timestamp, frame)
+                self.latest.set(TrackingResult(timestamp, frame, landmarks, keys))
+                self.result_ready.emit()
+        finally:
+            landmarker.close()
+            self.camera.release()
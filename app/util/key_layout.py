@@ -0,0 +1,158 @@
+import numpy as np
+
+from app.util.landmarks import FINGERTIPS, HAND_LABELS, finger_label
+
+FINGERTIP_INDICES = np.array(list(FINGERTIPS))
+FINGERTIP_LABELS = tuple(finger_label(hand, name) for hand in HAND_LABELS for name in FINGERTIPS.values())
+
+
+def fingertips(landmarks):
+    # (..., hand, landmark, xyz) -> (..., 10, xy), ordered like FINGERTIP_LABELS.
+    tips = landmarks[..., FINGERTIP_INDICES, :2]
+    return tips.reshape(tips.shape[:-3] + (len(FINGERTIP_LABELS), 2))
+
+
+def _argmin_fingers(distances):
+    # Index into FINGERTIP_LABELS of the closest tip, or -1 when no hand was visible.
+    distances = np.where(np.isnan(distances), np.inf, distances)
+    closest = np.argmin(distances, axis=-1)
+    return np.where(np.isinf(np.min(distances, axis=-1)), -1, closest)
+
+
+class KeyGrid:
+    # Uniform grid over key boxes for point-in-key lookups. Each cell holds the
+    # keys overlapping it (smallest first, so nested boxes resolve to the
+    # tighter key), padded into one array so queries stay vectorized.
+    def __init__(self, boxes):
+        self.boxes = boxes
+        if not len(boxes):
+            self.origin = np.zeros(2, dtype=np.float32)
+            self.cell_size = np.ones(2, dtype=np.float32)
+            self.shape = (0, 0)
+            self.cells = np.full((0, 1), -1, dtype=np.intp)
+            return
+
+        sizes = np.maximum(boxes[:, 2:] - boxes[:, :2], 1)
+        self.origin = boxes[:, :2].min(axis=0)
+        self.cell_size = np.median(sizes, axis=0)
+        extent = boxes[:, 2:].max(axis=0) - self.origin
+        self.shape = tuple(int(n) for n in np.maximum(np.ceil(extent / self.cell_size), 1)[::-1])
+
+        order = np.argsort(sizes[:, 0] * sizes[:, 1], kind="stable")
+        cell_lists = [[] for _ in range(self.shape[0] * self.shape[1])]
+        for key in order:
+            c1 = self._cell(boxes[key, :2])
+            c2 = self._cell(boxes[key, 2:])
+            for row in range(c1[1], c2[1] + 1):
+                for col in range(c1[0], c2[0] + 1):
+                    cell_lists[row * self.shape[1] + col].append(key)
+
+        width = max(1, max(len(keys) for keys in cell_lists))
+        self.cells = np.full((len(cell_lists), width), -1, dtype=np.intp)
+        for i, keys in enumerate(cell_lists):
+            self.cells[i, :len(keys)] = keys
+
+    def _cell(self, point):
+        col, row = ((np.asarray(point) - self.origin) // self.cell_size).astype(int)
+        return min(max(col, 0), self.shape[1] - 1), min(max(row, 0), self.shape[0] - 1)
+
+    def hit_test(self, points):
+        # (..., 2) points -> (...) index of the key containing each point, or -1.
+        points = np.asarray(points, dtype=np.float32)
+        flat = points.reshape(-1, 2)
+        result = np.full(len(flat), -1, dtype=np.intp)
+        if not len(self.boxes) or not len(flat):
+            return result.reshape(points.shape[:-1])
+
+        cell_xy = np.floor((flat - self.origin) / self.cell_size)
+        valid = ~np.isnan(flat).any(axis=1)
+        valid &= (cell_xy[:, 0] >= 0) & (cell_xy[:, 1] >= 0)
+        # Key boxes include their far edges, so a point on the layout's max
+        # x/y lands one cell past the grid; the box check below rejects
+        # anything clipped here that is truly outside.
+        cell_xy = np.minimum(cell_xy, [self.shape[1] - 1, self.shape[0] - 1])
+
+        idx = np.flatnonzero(valid)
+        cells = cell_xy[idx, 1].astype(np.intp) * self.shape[1] + cell_xy[idx, 0].astype(np.intp)
+        candidates = self.cells[cells]
+        boxes = self.boxes[np.maximum(candidates, 0)]
+        p = flat[idx][:, None, :]
+        inside = (candidates >= 0) & (p[..., 0] >= boxes[..., 0]) & (p[..., 0] <= boxes[..., 2]) \
+            & (p[..., 1] >= boxes[..., 1]) & (p[..., 1] <= boxes[..., 3])
+
+        found = inside.any(axis=1)
+        first = np.argmax(inside, axis=1)
+        result[idx[found]] = candidates[found, first[found]]
+        return result.reshape(points.shape[:-1])
+
+
+class KeyLayout:
+    def __init__(self, key_data):
+        self.labels = list(key_data)
+        self.index = {label: i for i, label in enumerate(self.labels)}
+        self.boxes = np.array([key_data[label] for label in self.labels], dtype=np.float32).reshape(-1, 4)
+        self.centers = (self.boxes[:, :2] + self.boxes[:, 2:]) / 2
+        self.grid = KeyGrid(self.boxes)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __contains__(self, label):
+        return label in self.index
+
+    def roi(self, pad_x=0.1, pad_y=0.6):
+        # Padded keyboard bounding box (x1, y1, x2, y2); padding is a fraction
+        # of the keyboard's width/height so hands above and below still fit.
+        if not len(self):
+            return None
+        x1, y1 = self.boxes[:, :2].min(axis=0)
+        x2, y2 = self.boxes[:, 2:].max(axis=0)
+        dx, dy = (x2 - x1) * pad_x, (y2 - y1) * pad_y
+        return int(x1 - dx), int(y1 - dy), int(np.ceil(x2 + dx)), int(np.ceil(y2 + dy))
+
+    def hit_test(self, points):
+        return self.grid.hit_test(points)
+
+    def nearest_keys(self, points, k=1):
+        # (..., 2) points -> ((..., k) key indices, (..., k) center distances),
+        # nearest first. A full scan of ~100 centers is already sub-millisecond.
+        points = np.asarray(points, dtype=np.float32)
+        k = min(k, len(self))
+        distances = np.linalg.norm(points[..., None, :] - self.centers, axis=-1)
+        distances = np.where(np.isnan(distances), np.inf, distances)
+        nearest = np.argpartition(distances, k - 1, axis=-1)[..., :k]
+        nearest_distances = np.take_along_axis(distances, nearest, axis=-1)
+        order = np.argsort(nearest_distances, axis=-1)
+        return np.take_along_axis(nearest, order, axis=-1), np.take_along_axis(nearest_distances, order, axis=-1)
+
+    def keys_under_fingertips(self, hands):
+        # (hand, landmark, xyz) -> (10,) key index under each fingertip, or -1.
+        return self.hit_test(fingertips(hands))
+
+    def key_indices(self, labels):
+        return np.array([self.index.get(label, -1) for label in labels], dtype=np.intp)
+
+    def distances_to_keys(self, tips, key_indices):
+        # tips (..., 10, 2) against K keys -> (..., 10, K)
+        centers = self.centers[np.asarray(key_indices)]
+        return np.linalg.norm(tips[..., :, None, :] - centers, axis=-1)
+
+    def distances_per_event(self, tips, key_indices):
+        # One key per row of tips: (N, 10, 2) with (N,) keys -> (N, 10)
+        centers = self.centers[np.asarray(key_indices)]
+        return np.linalg.norm(tips - centers[:, None, :], axis=-1)
+
+    def closest_finger(self, hands, key_label):
+        if key_label not in self.index:
+            return None
+        distances = self.distances_to_keys(fingertips(hands), [self.index[key_label]])[..., 0]
+        closest = _argmin_fingers(distances)
+        return FINGERTIP_LABELS[closest] if closest >= 0 else None
+
+    def closest_fingers(self, landmarks, key_indices):
+        # Scores a whole session at once: (N, hand, landmark, xyz) frames paired
+        # with (N,) key indices -> (N,) indices into FINGERTIP_LABELS (-1 if no hand
+        # or unknown key).
+        key_indices = np.asarray(key_indices)
+        closest = _argmin_fingers(self.distances_per_event(fingertips(landmarks), key_indices))
+        return np.where(key_indices < 0, -1, closest)
@@ -0,0 +1,94 @@
+import threading
+
+import cv2
+import numpy as np
+
+from app.util.keyboard_detector import get_keyboard_detector
+
+MOTION_SIZE = (64, 36)
+
+
+class KeyboardBoxTracker:
+    # Keeps a smoothed keyboard box for a live preview without running the
+    # detector on every frame. update() is called once per preview frame and
+    # only hands a frame to the background detection thread every Nth frame,
+    # or sooner when the scene has moved, and never while a detection is
+    # still running. Between detections the last smoothed box is reused.
+    def __init__(self, conf=0.5, every_n_frames=15, motion_threshold=6.0, smoothing=0.4, max_misses=3):
+        self.conf = conf
+        self.every_n_frames = every_n_frames
+        self.motion_threshold = motion_threshold
+        self.smoothing = smoothing
+        self.max_misses = max_misses
+
+        self.box = None
+        self.detections = 0
+        self._misses = 0
+        self._frames_since_submit = every_n_frames
+        self._reference = None
+        self._pending = None
+        self._busy = False
+        self._running = True
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def update(self, frame):
+        self._frames_since_submit += 1
+        with self._cond:
+            busy = self._busy or self._pending is not None
+        if not busy:
+            small = cv2.cvtColor(cv2.resize(frame, MOTION_SIZE, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+            moved = self._reference is not None and \
+                np.mean(cv2.absdiff(small, self._reference)) > self.motion_threshold
+            if moved or self._frames_since_submit >= self.every_n_frames:
+                self._reference = small
+                self._frames_since_submit = 0
+                with self._cond:
+                    self._pending = frame
+                    self._cond.notify()
+        return self.current_box()
+
+    def current_box(self):
+        box = self.box
+        return tuple(int(round(v)) for v in box) if box is not None else None
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+
+    def _run(self):
+        detector = None
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending is not None or not self._running)
+                if not self._running:
+                    return
+                frame, self._pending = self._pending, None
+                self._busy = True
+
+            try:
+                if detector is None:
+                    detector = get_keyboard_detector()
+                self._apply(detector.find_keyboard(frame, self.conf))
+            except Exception as e:
+                print(f"Keyboard detection failed: {e}")
+            finally:
+                with self._cond:
+                    self._busy = False
+
+    def _apply(self, box):
+        self.detections += 1
+        if box is None:
+            self._misses += 1
+            if self._misses > self.max_misses:
+                self.box = None
+            return
+
+        self._misses = 0
+        box = np.array(box, dtype=np.float64)
+        if self.box is None:
+            self.box = box
+        else:
+            self.box = self.smoothing * box + (1 - self.smoothing) * self.box
@@ -0,0 +1,146 @@
+import json
+import os
+
+import cv2
+import numpy as np
+
+from app.util.config_manager import BASE_DIR
+
+REPO_DIR = os.path.dirname(BASE_DIR)
+DATASET_DIR = os.path.join(REPO_DIR, "keyboard_dataset")
+DATASET_YAML = os.path.join(REPO_DIR, "keyboard.yaml")
+RUNS_DIR = os.path.join(REPO_DIR, "runs")
+CACHE_DIR = os.path.join(RUNS_DIR, "cache")
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+PAD_VALUE = 114
+
+
+def resolve_dataset_yaml(yaml_path=DATASET_YAML, dataset_dir=DATASET_DIR, out_dir=CACHE_DIR):
+    # keyboard.yaml carries the absolute path of the machine it was written
+    # on; write a copy pointing at the dataset inside this checkout.
+    import yaml
+
+    with open(yaml_path, "r") as f:
+        data = yaml.safe_load(f)
+    data["path"] = os.path.abspath(dataset_dir)
+
+    os.makedirs(out_dir, exist_ok=True)
+    resolved = os.path.join(out_dir, "keyboard_resolved.yaml")
+    with open(resolved, "w") as f:
+        yaml.safe_dump(data, f, sort_keys=False)
+    return resolved
+
+
+def list_images(split, dataset_dir=DATASET_DIR):
+    image_dir = os.path.join(dataset_dir, "images", split)
+    return sorted(
+        os.path.join(image_dir, name)
+        for name in os.listdir(image_dir)
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+
+
+def label_path(image_path):
+    # keyboard_dataset/images/<split>/x.jpg -> keyboard_dataset/labels/<split>/x.txt
+    image_dir, name = os.path.split(image_path)
+    split_dir, split = os.path.split(image_dir)
+    return os.path.join(os.path.dirname(split_dir), "labels", split, os.path.splitext(name)[0] + ".txt")
+
+
+def load_label_boxes(image_path, width, height, class_id=0):
+    # YOLO "class cx cy w h" (normalised) rows -> (N, 4) pixel xyxy boxes.
+    path = label_path(image_path)
+    boxes = []
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) != 5 or int(parts[0]) != class_id:
+                    continue
+                cx, cy, w, h = map(float, parts[1:])
+                boxes.append([(cx - w / 2) * width, (cy - h / 2) * height,
+                              (cx + w / 2) * width, (cy + h / 2) * height])
+    return np.array(boxes, dtype=np.float32).reshape(-1, 4)
+
+
+def letterbox(image, size):
+    # Aspect-preserving resize into a size x size canvas padded with grey, as
+    # YOLO expects. Returns the canvas, the scale and the (x, y) padding.
+    h, w = image.shape[:2]
+    scale = min(size / w, size / h)
+    new_w, new_h = int(round(w * scale)), int(round(h * scale))
+    pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+
+    canvas = np.full((size, size, 3), PAD_VALUE, dtype=np.uint8)
+    resized = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = resized
+    return canvas, scale, (pad_x, pad_y)
+
+
+def unletterbox(boxes, scale, pad):
+    # Boxes on a letterboxed canvas -> boxes in the original image.
+    boxes = np.array(boxes, dtype=np.float32)
+    boxes[..., [0, 2]] = (boxes[..., [0, 2]] - pad[0]) / scale
+    boxes[..., [1, 3]] = (boxes[..., [1, 3]] - pad[1]) / scale
+    return boxes
+
+
+class LetterboxCache:
+    # Decoded, letterboxed images of one split in a memory-mapped uint8 array
+    # (N, size, size, 3), so repeated passes skip JPEG decoding and resizing.
+    # The index file records the source files and their mtimes; any change
+    # rebuilds the cache.
+    def __init__(self, split, size, dataset_dir=DATASET_DIR, cache_dir=CACHE_DIR):
+        self.split = split
+        self.size = size
+        self.paths = list_images(split, dataset_dir)
+        self.data_path = os.path.join(cache_dir, f"{split}_{size}.u8")
+        self.index_path = os.path.join(cache_dir, f"{split}_{size}.json")
+        os.makedirs(cache_dir, exist_ok=True)
+
+        if not self._is_fresh():
+            self._build()
+        with open(self.index_path, "r") as f:
+            self.index = json.load(f)
+        shape = (len(self.paths), size, size, 3)
+        self.images = np.memmap(self.data_path, dtype=np.uint8, mode="r", shape=shape) if self.paths else np.zeros(shape, np.uint8)
+
+    def __len__(self):
+        return len(self.paths)
+
+    def _sources(self):
+        return [[os.path.basename(path), os.path.getmtime(path)] for path in self.paths]
+
+    def _is_fresh(self):
+        if not (os.path.exists(self.index_path) and os.path.exists(self.data_path)):
+            return False
+        with open(self.index_path, "r") as f:
+            index = json.load(f)
+        expected_bytes = len(self.paths) * self.size * self.size * 3
+        return index.get("sources") == self._sources() and os.path.getsize(self.data_path) == expected_bytes
+
+    def _build(self):
+        entries = []
+        if self.paths:
+            shape = (len(self.paths), self.size, self.size, 3)
+            images = np.memmap(self.data_path, dtype=np.uint8, mode="w+", shape=shape)
+            for i, path in enumerate(self.paths):
+                image = cv2.imread(path)
+                h, w = image.shape[:2]
+                images[i], scale, pad = letterbox(image, self.size)
+                entries.append({"width": w, "height": h, "scale": scale, "pad": pad})
+            images.flush()
+            del images
+        else:
+            open(self.data_path, "wb").close()
+
+        with open(self.index_path, "w") as f:
+            json.dump({"sources": self._sources(), "entries": entries}, f)
+
+    def entry(self, i):
+        return self.index["entries"][i]
+
+    def label_boxes(self, i):
+        entry = self.entry(i)
+        return load_label_boxes(self.paths[i], entry["width"], entry["height"])
@@ -0,0 +1,308 @@
+import ast
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from app.util.config_manager import get_setting
+from app.util.keyboard_dataset import letterbox, unletterbox
+
+DEFAULT_WEIGHTS = "runs/detect/train/weights/best.pt"
+DEFAULT_BACKEND_WEIGHTS = {
+    "ultralytics": DEFAULT_WEIGHTS,
+    "onnx": "runs/detect/train/weights/best.onnx",
+    "openvino": "runs/detect/train/weights/best_openvino_model",
+}
+KEYBOARD_LABEL = "keyboard"
+
+
+class KeyboardDetector:
+    # Backend-independent keyboard detection. Subclasses load a model in
+    # _load() and turn a list of BGR frames into keyboard boxes in _predict();
+    # batching, locking, warm-up and timings live here.
+    backend = None
+
+    def __init__(self, weights, warmup_shape=(720, 1280)):
+        self.weights = weights
+        self._lock = threading.Lock()
+
+        start = time.perf_counter()
+        self._load(weights)
+        self.load_time = time.perf_counter() - start
+
+        # The first call pays for graph setup and allocator warm-up; do it
+        # here so the first real frame isn't the slow one.
+        start = time.perf_counter()
+        self._predict([np.zeros(warmup_shape + (3,), dtype=np.uint8)], 0.5)
+        self.warmup_time = time.perf_counter() - start
+
+        self.first_inference_time = None
+        self.last_inference_time = None
+
+    def _load(self, weights):
+        raise NotImplementedError
+
+    def _predict(self, frames, conf):
+        # [[(x1, y1, x2, y2, score), ...] per frame], highest score first.
+        raise NotImplementedError
+
+    def detect(self, frame, conf=0.5):
+        # Keyboard boxes as (x1, y1, x2, y2, score), highest score first.
+        return self.detect_batch([frame], conf)[0]
+
+    def detect_batch(self, frames, conf=0.5):
+        start = time.perf_counter()
+        with self._lock:
+            boxes = self._predict(list(frames), conf)
+        self._record_inference(time.perf_counter() - start)
+        return boxes
+
+    def find_keyboard(self, frame, conf=0.5):
+        boxes = self.detect(frame, conf)
+        return boxes[0][:4] if boxes else None
+
+    def find_keyboard_in_burst(self, frames, conf=0.5, iou_threshold=0.5):
+        boxes = [box for frame_boxes in self.detect_batch(frames, conf) for box in frame_boxes]
+        return fuse_boxes(boxes, iou_threshold)
+
+    def timings(self):
+        return {
+            "load": self.load_time,
+            "warmup": self.warmup_time,
+            "first_inference": self.first_inference_time,
+            "last_inference": self.last_inference_time,
+        }
+
+    def _record_inference(self, seconds):
+        if self.first_inference_time is None:
+            self.first_inference_time = seconds
+        self.last_inference_time = seconds
+
+
+class UltralyticsDetector(KeyboardDetector):
+    backend = "ultralytics"
+
+    def _load(self, weights):
+        from ultralytics import YOLO
+
+        self.model = YOLO(weights)
+
+    def _predict(self, frames, conf):
+        results = self.model(frames, conf=conf, verbose=False)
+        return [self._keyboard_boxes(result) for result in results]
+
+    def _keyboard_boxes(self, result):
+        boxes = []
+        for box in result.boxes:
+            if self.model.names[int(box.cls[0])] == KEYBOARD_LABEL:
+                x1, y1, x2, y2 = map(int, box.xyxy[0])
+                boxes.append((x1, y1, x2, y2, float(box.conf[0])))
+        return sorted(boxes, key=lambda b: b[4], reverse=True)
+
+
+class ExportedDetector(KeyboardDetector):
+    # Runs a YOLOv8 export without importing ultralytics or torch: letterbox,
+    # one forward pass over the batch, then decode the (batch, 4 + classes,
+    # anchors) output and apply NMS with OpenCV.
+    def __init__(self, weights, imgsz=640, iou_threshold=0.45, threads=0, **kwargs):
+        self.imgsz = imgsz
+        self.iou_threshold = iou_threshold
+        self.threads = threads
+        self.class_id = 0
+        self.fixed_batch = None
+        super().__init__(weights, **kwargs)
+
+    def _forward(self, batch):
+        raise NotImplementedError
+
+    def _set_class_names(self, names):
+        # Export metadata stores names as "{0: 'keyboard'}".
+        if isinstance(names, str):
+            names = ast.literal_eval(names)
+        for class_id, name in (names or {}).items():
+            if name == KEYBOARD_LABEL:
+                self.class_id = int(class_id)
+
+    def _predict(self, frames, conf):
+        letterboxed = [letterbox(frame, self.imgsz) for frame in frames]
+        batch = np.stack([canvas for canvas, _, _ in letterboxed])
+        batch = np.ascontiguousarray(batch[..., ::-1].transpose(0, 3, 1, 2), dtype=np.float32) / 255.0
+
+        if self.fixed_batch and len(batch) != self.fixed_batch:
+            outputs = self._forward_fixed(batch)
+        else:
+            outputs = self._forward(batch)
+
+        return [
+            self._decode(output, conf, scale, pad, frame.shape)
+            for output, (_, scale, pad), frame in zip(outputs, letterboxed, frames)
+        ]
+
+    def _forward_fixed(self, batch):
+        # Exports with a static batch size only accept exactly fixed_batch
+        # images: run fixed_batch-sized chunks, padding the last one with
+        # blank images whose outputs are dropped.
+        size = self.fixed_batch
+        outputs = []
+        for first in range(0, len(batch), size):
+            chunk = batch[first:first + size]
+            count = len(chunk)
+            if count < size:
+                padding = np.zeros((size - count,) + chunk.shape[1:], dtype=chunk.dtype)
+                chunk = np.concatenate([chunk, padding])
+            outputs.append(self._forward(chunk)[:count])
+        return np.concatenate(outputs)
+
+    def _decode(self, output, conf, scale, pad, frame_shape):
+        predictions = output.T
+        scores = predictions[:, 4 + self.class_id]
+        keep = scores >= conf
+        if not keep.any():
+            return []
+
+        cx, cy, w, h = predictions[keep, :4].T
+        scores = scores[keep]
+        xywh = np.stack([cx - w / 2, cy - h / 2, w, h], axis=1)
+        kept = np.asarray(cv2.dnn.NMSBoxes(xywh.tolist(), scores.tolist(), conf, self.iou_threshold),
+                          dtype=np.intp).reshape(-1)
+        if kept.size == 0:
+            return []
+
+        xyxy = xywh[kept].copy()
+        xyxy[:, 2:] += xyxy[:, :2]
+        xyxy = unletterbox(xyxy, scale, pad)
+        height, width = frame_shape[:2]
+        xyxy[:, [0, 2]] = np.clip(xyxy[:, [0, 2]], 0, width)
+        xyxy[:, [1, 3]] = np.clip(xyxy[:, [1, 3]], 0, height)
+
+        boxes = [(*map(int, box), float(score)) for box, score in zip(xyxy, scores[kept])]
+        return sorted(boxes, key=lambda b: b[4], reverse=True)
+
+
+class OnnxDetector(ExportedDetector):
+    backend = "onnx"
+
+    def _load(self, weights):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.threads:
+            options.intra_op_num_threads = self.threads
+        self.session = ort.InferenceSession(weights, options, providers=["CPUExecutionProvider"])
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        batch, _, height, _ = model_input.shape
+        if isinstance(batch, int):
+            self.fixed_batch = batch
+        if isinstance(height, int):
+            self.imgsz = height
+        self._set_class_names(self.session.get_modelmeta().custom_metadata_map.get("names"))
+
+    def _forward(self, batch):
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+class OpenVinoDetector(ExportedDetector):
+    backend = "openvino"
+
+    def _load(self, weights):
+        import openvino as ov
+
+        # ultralytics exports a directory holding the .xml/.bin pair and a
+        # metadata.yaml with the class names.
+        model_dir = weights if os.path.isdir(weights) else os.path.dirname(weights)
+        if os.path.isdir(weights):
+            weights = next(os.path.join(weights, f) for f in sorted(os.listdir(weights)) if f.endswith(".xml"))
+
+        core = ov.Core()
+        config = {"INFERENCE_NUM_THREADS": self.threads} if self.threads else {}
+        model = core.read_model(weights)
+        self.compiled = core.compile_model(model, "CPU", config)
+
+        batch, _, height, _ = model.input(0).get_partial_shape()
+        if batch.is_static:
+            self.fixed_batch = batch.get_length()
+        if height.is_static:
+            self.imgsz = height.get_length()
+
+        metadata = os.path.join(model_dir, "metadata.yaml")
+        if os.path.exists(metadata):
+            import yaml
+
+            with open(metadata, "r") as f:
+                self._set_class_names(yaml.safe_load(f).get("names"))
+
+    def _forward(self, batch):
+        return self.compiled(batch)[self.compiled.output(0)]
+
+
+BACKENDS = {
+    "ultralytics": UltralyticsDetector,
+    "onnx": OnnxDetector,
+    "openvino": OpenVinoDetector,
+}
+
+
+def create_detector(backend, weights=None):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown detector backend '{backend}' (expected one of {', '.join(BACKENDS)})")
+    weights = weights or DEFAULT_BACKEND_WEIGHTS[backend]
+    if backend == "ultralytics":
+        return UltralyticsDetector(weights)
+    return BACKENDS[backend](
+        weights,
+        imgsz=get_setting("detector_imgsz", 640),
+        threads=get_setting("detector_threads", 0),
+    )
+
+
+def box_iou(box, boxes):
+    boxes = np.asarray(boxes, dtype=np.float64)
+    ix1 = np.maximum(box[0], boxes[:, 0])
+    iy1 = np.maximum(box[1], boxes[:, 1])
+    ix2 = np.minimum(box[2], boxes[:, 2])
+    iy2 = np.minimum(box[3], boxes[:, 3])
+    inter = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    union = area + areas - inter
+    return np.where(union > 0, inter / np.where(union > 0, union, 1), 0.0)
+
+
+def fuse_boxes(boxes, iou_threshold=0.5):
+    # IoU voting over (x1, y1, x2, y2, score) boxes from several frames: the
+    # box that agrees with the most others (ties broken by total score) wins,
+    # and the result is the per-coordinate median of its supporters.
+    if not boxes:
+        return None
+
+    boxes = np.asarray(boxes, dtype=np.float64)
+    coords, scores = boxes[:, :4], boxes[:, 4]
+    support = np.array([box_iou(box, coords) >= iou_threshold for box in coords])
+    votes = support.sum(axis=1) + (support * scores).sum(axis=1) / (scores.sum() + 1)
+    members = support[np.argmax(votes)]
+
+    return tuple(int(round(v)) for v in np.median(coords[members], axis=0))
+
+
+_detectors = {}
+_registry_lock = threading.Lock()
+
+
+def get_keyboard_detector(weights=None, backend=None):
+    # One detector per (backend, weights), chosen by the detector_backend and
+    # detector_weights settings unless given explicitly.
+    backend = backend or get_setting("detector_backend", "ultralytics")
+    weights = weights or get_setting("detector_weights", None) or DEFAULT_BACKEND_WEIGHTS.get(backend)
+    with _registry_lock:
+        detector = _detectors.get((backend, weights))
+        if detector is None:
+            detector = create_detector(backend, weights)
+            _detectors[(backend, weights)] = detector
+            print(f"Loaded {backend} keyboard detector '{weights}' in {detector.load_time * 1000:.0f} ms "
+                  f"(warm-up {detector.warmup_time * 1000:.0f} ms)")
+    return detector
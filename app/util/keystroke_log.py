@@ -0,0 +1,77 @@
+from array import array
+from collections import namedtuple
+
+import numpy as np
+
+from app.util.landmarks import FINGERS, finger_index, finger_mask, mask_fingers
+
+KeystrokeEvent = namedtuple("KeystrokeEvent", ["key", "used", "expected", "correct", "timestamp", "confidence"])
+
+
+class KeystrokeLog:
+    # Append-only keystroke log stored as typed arrays with interned key labels,
+    # FINGERS indices for the finger used and finger_mask() bitmasks for the
+    # allowed fingers, so an event costs a few bytes instead of a dict.
+    def __init__(self):
+        self.key_labels = []
+        self.key_index = {}
+        self.keys = array("H")
+        self.used = array("B")
+        self.expected = array("H")
+        self.correct = array("B")
+        self.timestamps = array("d")
+        self.confidences = array("f")
+
+    def __len__(self):
+        return len(self.keys)
+
+    def append(self, key_label, used, expected, correct, timestamp, confidence=0.0):
+        code = self.key_index.get(key_label)
+        if code is None:
+            code = self.key_index[key_label] = len(self.key_labels)
+            self.key_labels.append(key_label)
+
+        self.keys.append(code)
+        self.used.append(finger_index(used))
+        self.expected.append(finger_mask(expected))
+        self.correct.append(1 if correct else 0)
+        self.timestamps.append(timestamp)
+        self.confidences.append(confidence)
+
+    def event(self, i):
+        expected = mask_fingers(self.expected[i])
+        return KeystrokeEvent(
+            self.key_labels[self.keys[i]],
+            FINGERS[self.used[i]],
+            "/".join(expected) if expected else "N/A",
+            bool(self.correct[i]),
+            self.timestamps[i],
+            self.confidences[i],
+        )
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.event(i)
+
+    def by_key(self):
+        # {key label: [KeystrokeEvent, ...]} in first-pressed order.
+        grouped = {}
+        for event in self:
+            grouped.setdefault(event.key, []).append(event)
+        return grouped
+
+    def technique_accuracy(self):
+        return sum(self.correct) / len(self) * 100 if len(self) else 0.0
+
+    def columns(self):
+        # NumPy copies of the columns; copying keeps the arrays appendable,
+        # which they would not be while a buffer view is alive.
+        return {
+            "key": np.frombuffer(self.keys, dtype=np.uint16).copy(),
+            "key_labels": list(self.key_labels),
+            "expected": np.frombuffer(self.expected, dtype=np.uint16).copy(),
+            "used": np.frombuffer(self.used, dtype=np.uint8).copy(),
+            "correct": np.frombuffer(self.correct, dtype=np.uint8).astype(np.bool_),
+            "timestamp": np.frombuffer(self.timestamps, dtype=np.float64).copy(),
+            "confidence": np.frombuffer(self.confidences, dtype=np.float32).copy(),
+        }
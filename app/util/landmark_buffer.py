@@ -0,0 +1,90 @@
+import threading
+
+import numpy as np
+
+from app.util.key_layout import FINGERTIP_INDICES, FINGERTIP_LABELS
+from app.util.landmarks import HAND_LABELS, NUM_LANDMARKS
+
+WRIST = 0
+MIDDLE_MCP = 9
+
+
+def _relative_tips(hands):
+    return hands[:, FINGERTIP_INDICES] - hands[:, WRIST:WRIST + 1]
+
+
+def strike_scores(previous, current, dt):
+    # Per-fingertip striking speed between two (hand, landmark, xyz) frames,
+    # in hand lengths per second, ordered like FINGERTIP_LABELS. Motion is
+    # taken relative to the wrist and to the median of the hand's other tips,
+    # so moving the whole hand does not count as a press; only downward (+y)
+    # and away-from-camera (+z) motion scores. Missing hands score 0.
+    hand_length = np.linalg.norm(current[:, MIDDLE_MCP, :2] - current[:, WRIST, :2], axis=-1)
+
+    velocity = (_relative_tips(current) - _relative_tips(previous)) / (dt * hand_length[:, None, None])
+    press = np.clip(velocity[..., 1], 0, None) + np.clip(velocity[..., 2], 0, None)
+    press = press - np.median(press, axis=-1, keepdims=True)
+    press = np.clip(press, 0, None).reshape(len(FINGERTIP_LABELS))
+    return np.nan_to_num(press, nan=0.0, posinf=0.0)
+
+
+class LandmarkRingBuffer:
+    # Recent landmark frames plus the strike score of each fingertip, which is
+    # computed on push so keystroke attribution only has to look it up.
+    def __init__(self, capacity=64):
+        self.capacity = capacity
+        self.timestamps = np.full(capacity, -np.inf)
+        self.landmarks = np.full((capacity, len(HAND_LABELS), NUM_LANDMARKS, 3), np.nan, dtype=np.float32)
+        self.strikes = np.zeros((capacity, len(FINGERTIP_LABELS)), dtype=np.float32)
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def push(self, timestamp, hands):
+        strikes = 0.0
+        if self.count:
+            previous = (self.count - 1) % self.capacity
+            dt = timestamp - self.timestamps[previous]
+            if dt > 0:
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    strikes = strike_scores(self.landmarks[previous], hands, dt)
+
+        with self._lock:
+            slot = self.count % self.capacity
+            self.timestamps[slot] = timestamp
+            self.landmarks[slot] = hands
+            self.strikes[slot] = strikes
+            self.count += 1
+
+    def latest(self):
+        with self._lock:
+            if not self.count:
+                return None
+            slot = (self.count - 1) % self.capacity
+            return self.timestamps[slot], self.landmarks[slot].copy()
+
+    def closest(self, timestamp, max_gap=None):
+        # Entries ordered by distance from timestamp, nearest first.
+        with self._lock:
+            size = len(self)
+            timestamps = self.timestamps[:size].copy()
+            landmarks = self.landmarks[:size].copy()
+
+        gaps = np.abs(timestamps - timestamp)
+        order = np.argsort(gaps)
+        if max_gap is not None:
+            order = order[gaps[order] <= max_gap]
+        return [(timestamps[i], landmarks[i]) for i in order]
+
+    def peak_strikes(self, start, end):
+        # (10,) highest strike score of each fingertip between start and end.
+        with self._lock:
+            size = len(self)
+            in_window = (self.timestamps[:size] >= start) & (self.timestamps[:size] <= end)
+            strikes = self.strikes[:size][in_window]
+
+        if not len(strikes):
+            return np.zeros(len(FINGERTIP_LABELS), dtype=np.float32)
+        return strikes.max(axis=0)
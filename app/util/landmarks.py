@@ -0,0 +1,195 @@
+import cv2
+import numpy as np
+
+from app.util.config_manager import get_setting
+from app.util.one_euro import OneEuroFilter
+
+HAND_LABELS = ("Left", "Right")
+NUM_LANDMARKS = 21
+
+FINGER_LANDMARKS = {
+    "Thumb": [1, 2, 3, 4],
+    "Index": [5, 6, 7, 8],
+    "Middle": [9, 10, 11, 12],
+    "Ring": [13, 14, 15, 16],
+    "Pinky": [17, 18, 19, 20],
+}
+
+FINGERTIPS = {4: "Thumb", 8: "Index", 12: "Middle", 16: "Ring", 20: "Pinky"}
+
+HAND_CONNECTIONS = [
+    (0, 1), (1, 2), (2, 3), (3, 4),
+    (0, 5), (5, 6), (6, 7), (7, 8),
+    (5, 9), (9, 10), (10, 11), (11, 12),
+    (9, 13), (13, 14), (14, 15), (15, 16),
+    (13, 17), (0, 17), (17, 18), (18, 19), (19, 20),
+]
+
+
+# Interned finger vocabulary for compact storage; index 0 means unknown/not set.
+FINGERS = (
+    "Unknown",
+    "Left Pinky", "Left Ring", "Left Middle", "Left Index",
+    "Thumb",
+    "Right Index", "Right Middle", "Right Ring", "Right Pinky",
+)
+FINGER_INDEX = {name: i for i, name in enumerate(FINGERS)}
+
+
+def finger_index(label):
+    return FINGER_INDEX.get(label, 0)
+
+
+def finger_mask(labels):
+    # One finger label or a list of allowed ones -> bitmask with bit i set for
+    # FINGERS[i]; 0 when none is known.
+    if not isinstance(labels, (list, tuple)):
+        labels = [labels]
+    mask = 0
+    for label in labels:
+        index = FINGER_INDEX.get(label, 0)
+        if index:
+            mask |= 1 << index
+    return mask
+
+
+def mask_fingers(mask):
+    # Inverse of finger_mask(): the allowed finger labels, in FINGERS order.
+    return tuple(finger for i, finger in enumerate(FINGERS) if i and mask & (1 << i))
+
+
+def finger_label(hand_label, finger_name):
+    return "Thumb" if finger_name == "Thumb" else f"{hand_label} {finger_name}"
+
+
+def empty_hands():
+    return np.full((len(HAND_LABELS), NUM_LANDMARKS, 3), np.nan, dtype=np.float32)
+
+
+def hands_to_array(results, width, height, offset=(0, 0)):
+    # Packs a MediaPipe result into a (hand, landmark, xyz) array in pixel
+    # coordinates, indexed by HAND_LABELS. Missing hands are left as NaN.
+    # offset shifts landmarks from a cropped image back to the full frame.
+    hands = empty_hands()
+    if not results.multi_hand_landmarks or not results.multi_handedness:
+        return hands
+
+    # MediaPipe can give both hands the same label when they are crossed or
+    # close together. Hands are placed most confident first, and one whose
+    # slot is taken goes into the free slot instead of overwriting it.
+    detections = sorted(
+        zip(results.multi_hand_landmarks, results.multi_handedness),
+        key=lambda d: d[1].classification[0].score,
+        reverse=True,
+    )
+    filled = set()
+    for hand_landmarks, hand_handedness in detections:
+        raw_label = hand_handedness.classification[0].label
+        hand_label = "Left" if raw_label == "Right" else "Right"
+        slot = HAND_LABELS.index(hand_label)
+        if slot in filled:
+            free = [i for i in range(len(HAND_LABELS)) if i not in filled]
+            if not free:
+                break
+            slot = free[0]
+        filled.add(slot)
+        hands[slot] = [(lm.x * width, lm.y * height, lm.z * width) for lm in hand_landmarks.landmark]
+
+    hands[..., 0] += offset[0]
+    hands[..., 1] += offset[1]
+
+    return hands
+
+
+def visible_hands(hands):
+    return [i for i in range(len(HAND_LABELS)) if not np.isnan(hands[i, 0, 0])]
+
+
+class HandLandmarker:
+    # MediaPipe Hands wrapper that takes BGR frames and returns the packed
+    # array from hands_to_array(); shared by the live tracker and replays.
+    # Landmarks come back normalised, so frames can be downscaled before
+    # inference at no cost to the full-frame coordinates.
+    def __init__(self, scale=1.0, smoothing=None, roi=None, **options):
+        import mediapipe as mp
+
+        self.scale = scale
+        self.smoothing = smoothing
+        self.roi = roi
+        self.full_frame = False
+        self.hands = mp.solutions.hands.Hands(**options)
+
+    @classmethod
+    def from_settings(cls, key_layout=None):
+        smoothing = None
+        if get_setting("landmark_smoothing", True):
+            smoothing = OneEuroFilter(
+                min_cutoff=get_setting("landmark_min_cutoff", 1.0),
+                beta=get_setting("landmark_beta", 0.01),
+            )
+        roi = None
+        if key_layout is not None and get_setting("crop_to_keyboard", True):
+            roi = key_layout.roi(get_setting("roi_padding_x", 0.1), get_setting("roi_padding_y", 0.6))
+        return cls(
+            scale=get_setting("hands_inference_scale", 0.5),
+            smoothing=smoothing,
+            roi=roi,
+            static_image_mode=False,
+            max_num_hands=2,
+            model_complexity=get_setting("hands_model_complexity", 0),
+            min_detection_confidence=get_setting("hands_min_detection_confidence", 0.5),
+            min_tracking_confidence=get_setting("hands_min_tracking_confidence", 0.5),
+        )
+
+    def crop_box(self, frame_shape):
+        h, w = frame_shape[:2]
+        if self.roi is None:
+            return 0, 0, w, h
+        x1, y1, x2, y2 = self.roi
+        x1, y1 = max(0, min(x1, w - 1)), max(0, min(y1, h - 1))
+        x2, y2 = max(x1 + 1, min(x2, w)), max(y1 + 1, min(y2, h))
+        return x1, y1, x2, y2
+
+    def _detect(self, frame, box):
+        x1, y1, x2, y2 = box
+        frame = frame[y1:y2, x1:x2]
+        w, h = x2 - x1, y2 - y1
+        if self.scale != 1.0:
+            frame = cv2.resize(frame, (max(1, int(w * self.scale)), max(1, int(h * self.scale))),
+                               interpolation=cv2.INTER_AREA)
+
+        results = self.hands.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        return hands_to_array(results, w, h, (x1, y1))
+
+    def process(self, frame, timestamp=None):
+        # The keyboard ROI can cut off raised hands, whose palm and wrist sit
+        # above the keys. When it finds no hand, the same frame is retried
+        # uncropped, and whole frames are used until every hand is back inside
+        # the ROI.
+        roi_box = self.crop_box(frame.shape)
+        full_box = (0, 0, frame.shape[1], frame.shape[0])
+        if self.roi is None:
+            hands = self._detect(frame, full_box)
+        elif self.full_frame:
+            hands = self._detect(frame, full_box)
+            visible = visible_hands(hands)
+            if visible and self._inside(hands[visible], roi_box):
+                self.full_frame = False
+        else:
+            hands = self._detect(frame, roi_box)
+            if not visible_hands(hands):
+                hands = self._detect(frame, full_box)
+                self.full_frame = bool(visible_hands(hands))
+
+        if self.smoothing is not None and timestamp is not None:
+            hands = self.smoothing(hands, timestamp).astype(np.float32)
+        return hands
+
+    @staticmethod
+    def _inside(hands, box):
+        x1, y1, x2, y2 = box
+        x, y = hands[..., 0], hands[..., 1]
+        return bool(np.all((x >= x1) & (x <= x2) & (y >= y1) & (y <= y2)))
+
+    def close(self):
+        self.hands.close()
@@ -0,0 +1,82 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+from app.util.config_manager import BASE_DIR
+
+REPORT_DIR = os.path.join(os.path.dirname(BASE_DIR), "reports")
+PERCENTILES = (50, 95, 99)
+
+
+class LatencyRecorder:
+    # Bounded per-stage samples (in seconds) for the real-time loop. Recording
+    # is an append under a lock, cheap enough for per-frame and per-key use.
+    def __init__(self, max_samples=5000):
+        self.max_samples = max_samples
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            samples = self._samples.get(stage)
+            if samples is None:
+                samples = self._samples[stage] = deque(maxlen=self.max_samples)
+            samples.append(seconds)
+
+    def record_since(self, stage, start):
+        self.record(stage, time.monotonic() - start)
+
+    @contextmanager
+    def span(self, stage):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.record_since(stage, start)
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+
+    def summary(self):
+        # {stage: {"count", "mean", "p50", "p95", "p99"}} in milliseconds.
+        with self._lock:
+            samples = {stage: np.array(values) * 1000 for stage, values in self._samples.items() if values}
+
+        summary = {}
+        for stage, values in samples.items():
+            stats = {"count": int(values.size), "mean": float(values.mean())}
+            for p, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+                stats[f"p{p}"] = float(value)
+            summary[stage] = stats
+        return summary
+
+    def format_summary(self):
+        lines = [f"{'Stage':<24}{'n':>6}" + "".join(f"{f'p{p}':>9}" for p in PERCENTILES)]
+        for stage, stats in sorted(self.summary().items()):
+            lines.append(f"{stage:<24}{stats['count']:>6}" + "".join(f"{stats[f'p{p}']:>7.1f}ms" for p in PERCENTILES))
+        return "\n".join(lines)
+
+    def dump(self, path=None):
+        if path is None:
+            os.makedirs(REPORT_DIR, exist_ok=True)
+            path = os.path.join(REPORT_DIR, time.strftime("latency_%Y%m%d_%H%M%S.json"))
+        try:
+            with open(path, "w") as f:
+                json.dump(self.summary(), f, indent=4)
+        except Exception as e:
+            print(f"Failed to write latency report '{path}': {e}")
+            return None
+        return path
+
+
+_recorder = LatencyRecorder()
+
+
+def get_latency_recorder():
+    return _recorder
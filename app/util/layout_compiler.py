@@ -0,0 +1,196 @@
+import json
+import os
+import threading
+
+import numpy as np
+
+from app.util.attribution import SHIFT_KEYS, key_label_for_char
+from app.util.config_manager import BASE_DIR, config_exists, config_stamp, load_config
+from app.util.key_layout import KeyLayout
+from app.util.landmarks import FINGER_INDEX, FINGERS
+
+# Bump whenever the compiled format or the compile rules change; caches from
+# other versions are ignored and rebuilt.
+LAYOUT_VERSION = 1
+LAYOUT_CACHE = os.path.join(os.path.dirname(BASE_DIR), "cache", "layout.npz")
+LAYOUT_SOURCES = ("keys", "keymap", "technique")
+SHIFT_KEY_LABELS = ("Left Shift", "Right Shift")
+
+
+class CompiledLayout:
+    # keys.json, keymap.json and technique.json compiled into one validated
+    # object: absolute key boxes as a KeyLayout, relative keymap boxes ready
+    # for vectorized projection, per-key expected-finger tables and the
+    # shift-key mapping. Invalid entries are dropped and listed in problems.
+    def __init__(self, key_labels, key_boxes, keymap_labels, keymap_boxes, technique, problems=()):
+        self.version = LAYOUT_VERSION
+        self.keys = KeyLayout(dict(zip(key_labels, key_boxes)))
+        self.keymap_labels = list(keymap_labels)
+        self.keymap_boxes = np.asarray(keymap_boxes, dtype=np.float32).reshape(-1, 4)
+        self.technique = technique
+        self.shift_keys = SHIFT_KEYS
+        self.problems = list(problems)
+
+        # (len(keys), most alternatives for any key) FINGERS indices, 0 where
+        # unset, read by is_expected_finger().
+        options = [self.expected_fingers(label) for label in self.keys.labels]
+        width = max([1] + [len(fingers) for fingers in options])
+        self.finger_table = np.zeros((len(self.keys), width), dtype=np.uint8)
+        for i, fingers in enumerate(options):
+            for j, finger in enumerate(fingers):
+                self.finger_table[i, j] = FINGER_INDEX[finger]
+
+    @property
+    def key_data(self):
+        # {label: [x1, y1, x2, y2]} like keys.json.
+        return {label: [int(v) for v in box] for label, box in zip(self.keys.labels, self.keys.boxes)}
+
+    def expected_fingers(self, key_label):
+        fingers = self.technique.get(key_label)
+        if isinstance(fingers, list):
+            return tuple(f for f in fingers if f)
+        return (fingers,) if fingers else ()
+
+    def is_expected_finger(self, key_label, finger):
+        # Whether finger is one of the technique's fingers for key_label; False
+        # for keys without a box, since no finger can be attributed to them.
+        i = self.keys.index.get(key_label)
+        code = FINGER_INDEX.get(finger, 0)
+        return i is not None and code != 0 and bool((self.finger_table[i] == code).any())
+
+    def keys_for_char(self, char):
+        # Keys to press for a character: its base key plus either shift key
+        # for shifted symbols.
+        keys = [key_label_for_char(char)]
+        if char in self.shift_keys:
+            keys += SHIFT_KEY_LABELS
+        return keys
+
+    def project(self, box):
+        # Relative keymap boxes -> {label: [x1, y1, x2, y2]} inside a keyboard
+        # box, truncated to ints.
+        x1, y1, x2, y2 = box
+        scale = np.array([x2 - x1, y2 - y1, x2 - x1, y2 - y1], dtype=np.float64)
+        origin = np.array([x1, y1, x1, y1], dtype=np.float64)
+        absolute = (origin + self.keymap_boxes * scale).astype(int)
+        return dict(zip(self.keymap_labels, absolute.tolist()))
+
+    def save(self, path, sources):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            version=np.array(self.version),
+            sources=np.array(json.dumps(sources)),
+            key_labels=np.array(self.keys.labels, dtype=str),
+            key_boxes=self.keys.boxes,
+            keymap_labels=np.array(self.keymap_labels, dtype=str),
+            keymap_boxes=self.keymap_boxes,
+            technique=np.array(json.dumps(self.technique)),
+            problems=np.array(self.problems, dtype=str),
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, sources):
+        # The cached layout, or None if it is missing, stale or from another
+        # LAYOUT_VERSION.
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if int(data["version"]) != LAYOUT_VERSION or json.loads(str(data["sources"])) != sources:
+                    return None
+                return cls(
+                    data["key_labels"].tolist(),
+                    data["key_boxes"],
+                    data["keymap_labels"].tolist(),
+                    data["keymap_boxes"],
+                    json.loads(str(data["technique"])),
+                    data["problems"].tolist(),
+                )
+        except (OSError, KeyError, ValueError):
+            return None
+
+
+def _is_box(value, relative=False):
+    if not isinstance(value, (list, tuple)) or len(value) != 4:
+        return False
+    if not all(isinstance(v, (int, float)) and np.isfinite(v) for v in value):
+        return False
+    x1, y1, x2, y2 = value
+    if relative and not all(-0.5 <= v <= 1.5 for v in value):
+        return False
+    return x2 > x1 and y2 > y1
+
+
+def _valid_boxes(name, boxes, problems, relative=False):
+    labels, valid = [], []
+    for label, box in (boxes or {}).items():
+        if _is_box(box, relative):
+            labels.append(label)
+            valid.append(box)
+        else:
+            problems.append(f"{name}: dropped key '{label}' with invalid box {box!r}")
+    return labels, np.array(valid, dtype=np.float32).reshape(-1, 4)
+
+
+def compile_layout(key_data, keymap, technique):
+    problems = []
+    key_labels, key_boxes = _valid_boxes("keys", key_data, problems)
+    keymap_labels, keymap_boxes = _valid_boxes("keymap", keymap, problems, relative=True)
+
+    valid_technique = {}
+    for label, fingers in (technique or {}).items():
+        options = fingers if isinstance(fingers, list) else [fingers]
+        unknown = [f for f in options if f and f not in FINGERS]
+        if unknown:
+            problems.append(f"technique: dropped key '{label}' with unknown finger(s) {unknown}")
+        else:
+            valid_technique[label] = fingers
+
+    return CompiledLayout(key_labels, key_boxes, keymap_labels, keymap_boxes, valid_technique, problems)
+
+
+def _source_stats():
+    return {name: config_stamp(name) for name in LAYOUT_SOURCES}
+
+
+def _is_pending(stats):
+    return any(stat and stat[0] == "pending" for stat in stats.values())
+
+
+def _read_source(name):
+    return load_config(name) if config_exists(name) else {}
+
+
+_layout = None
+_layout_sources = None
+_layout_lock = threading.Lock()
+
+
+def get_layout(cache_path=LAYOUT_CACHE):
+    # The compiled layout shared by every screen. Rebuilt only when one of the
+    # source files' mtime or size changes, or a new save of one is waiting to
+    # be written; otherwise it comes from memory or, on a fresh start, from
+    # the on-disk cache.
+    global _layout, _layout_sources
+    sources = _source_stats()
+    # Unwritten saves are compiled from the config store's memory, and the
+    # result is not cached on disk since it doesn't match the files yet.
+    pending = _is_pending(sources)
+    with _layout_lock:
+        if _layout is not None and sources == _layout_sources:
+            return _layout
+
+        layout = None if pending else CompiledLayout.load(cache_path, sources)
+        if layout is None:
+            layout = compile_layout(*(_read_source(name) for name in LAYOUT_SOURCES))
+            for problem in layout.problems:
+                print(f"Layout: {problem}")
+            if not pending:
+                try:
+                    layout.save(cache_path, sources)
+                except OSError as e:
+                    print(f"Failed to cache compiled layout: {e}")
+
+        _layout, _layout_sources = layout, sources
+        return layout
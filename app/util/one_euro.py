@@ -0,0 +1,46 @@
+import math
+
+import numpy as np
+
+
+def _alpha(dt, cutoff):
+    tau = 1.0 / (2 * math.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
+
+
+class OneEuroFilter:
+    # One-Euro low-pass filter (Casiez et al.) applied element-wise to an
+    # array of any shape. Slow movement is smoothed heavily, fast movement
+    # passes through with little lag. NaN inputs (e.g. a hand that left the
+    # frame) reset the state for those elements.
+    def __init__(self, min_cutoff=1.0, beta=0.0, d_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        self._x = None
+        self._dx = None
+        self._t = None
+
+    def __call__(self, x, timestamp):
+        x = np.asarray(x, dtype=np.float64)
+        if self._x is None:
+            self._x, self._dx, self._t = x.copy(), np.zeros_like(x), timestamp
+            return x
+
+        dt = timestamp - self._t
+        if dt <= 0:
+            return self._x.copy()
+
+        fresh = np.isnan(self._x)
+        a_d = _alpha(dt, self.d_cutoff)
+        dx = np.where(fresh, 0.0, (x - self._x) / dt)
+        dx_hat = np.where(fresh, 0.0, a_d * dx + (1 - a_d) * self._dx)
+
+        a = _alpha(dt, self.min_cutoff + self.beta * np.abs(dx_hat))
+        x_hat = np.where(fresh, x, a * x + (1 - a) * self._x)
+
+        self._x, self._dx, self._t = x_hat, np.where(np.isnan(x_hat), 0.0, dx_hat), timestamp
+        return x_hat
@@ -0,0 +1,168 @@
+import json
+import os
+import queue
+import struct
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from app.util.config_manager import BASE_DIR
+from app.util.landmarks import HAND_LABELS, NUM_LANDMARKS
+
+RECORDINGS_DIR = os.path.join(os.path.dirname(BASE_DIR), "recordings")
+
+# File layout: MAGIC, then append-only chunks of
+#   CHUNK_HEADER (b"CHNK", payload bytes, record count) + records
+# where every record is RECORD_HEADER (type, timestamp, payload bytes) + payload.
+# A crash can only lose the chunk being written; readers stop at a short chunk.
+MAGIC = b"TTAREC01"
+CHUNK_HEADER = struct.Struct("<4sII")
+RECORD_HEADER = struct.Struct("<BdI")
+
+RECORD_META = 0
+RECORD_KEYSTROKE = 1
+RECORD_LANDMARKS = 2
+RECORD_FRAME = 3
+
+LANDMARK_SHAPE = (len(HAND_LABELS), NUM_LANDMARKS, 3)
+
+
+def _pack_strings(*values):
+    data = b""
+    for value in values:
+        encoded = value.encode("utf-8")[:255]
+        data += struct.pack("<B", len(encoded)) + encoded
+    return data
+
+
+def _unpack_strings(data, count):
+    values, offset = [], 0
+    for _ in range(count):
+        size = data[offset]
+        values.append(data[offset + 1:offset + 1 + size].decode("utf-8"))
+        offset += 1 + size
+    return values, offset
+
+
+class SessionRecorder:
+    # Streams a typing session to disk from a background writer thread. The
+    # record_* methods only enqueue and never block. Meta and keystroke
+    # records are always queued; landmarks and frames share max_pending
+    # slots, and if the writer falls behind they are dropped (and counted).
+    def __init__(self, path, record_frames=False, jpeg_quality=80, max_pending=256, chunk_records=64):
+        self.path = path
+        self.record_frames = record_frames
+        self.jpeg_quality = jpeg_quality
+        self.chunk_records = chunk_records
+        self.dropped = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, "wb")
+        self._file.write(MAGIC)
+        self._queue = queue.Queue()
+        self._sample_slots = threading.Semaphore(max_pending)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def record_meta(self, meta):
+        self._queue.put_nowait((RECORD_META, time.monotonic(), meta))
+
+    def record_keystroke(self, timestamp, key_label, used, expected, correct):
+        if isinstance(expected, list):
+            expected = "/".join(expected)
+        self._queue.put_nowait((RECORD_KEYSTROKE, timestamp, (key_label, used or "", expected or "", bool(correct))))
+
+    def record_landmarks(self, timestamp, hands):
+        self._offer((RECORD_LANDMARKS, timestamp, hands))
+
+    def record_frame(self, timestamp, frame):
+        if self.record_frames:
+            self._offer((RECORD_FRAME, timestamp, frame))
+
+    def close(self):
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        self._file.close()
+
+    def _offer(self, item):
+        if self._sample_slots.acquire(blocking=False):
+            self._queue.put_nowait(item)
+        else:
+            self.dropped += 1
+
+    def _encode(self, kind, payload):
+        if kind == RECORD_LANDMARKS:
+            return np.ascontiguousarray(payload, dtype=np.float32).tobytes()
+        if kind == RECORD_FRAME:
+            ok, encoded = cv2.imencode(".jpg", payload, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+            return encoded.tobytes() if ok else None
+        if kind == RECORD_KEYSTROKE:
+            key_label, used, expected, correct = payload
+            return struct.pack("<B", correct) + _pack_strings(key_label, used, expected)
+        return json.dumps(payload).encode("utf-8")
+
+    def _run(self):
+        chunk, count, closing = bytearray(), 0, False
+        while not closing:
+            item = self._queue.get()
+            while item is not None:
+                kind, timestamp, payload = item
+                if kind in (RECORD_LANDMARKS, RECORD_FRAME):
+                    self._sample_slots.release()
+                data = self._encode(kind, payload)
+                if data is not None:
+                    chunk += RECORD_HEADER.pack(kind, timestamp, len(data)) + data
+                    count += 1
+                if count >= self.chunk_records or self._queue.empty():
+                    break
+                item = self._queue.get()
+            closing = item is None
+
+            if count:
+                self._file.write(CHUNK_HEADER.pack(b"CHNK", len(chunk), count) + chunk)
+                self._file.flush()
+                chunk, count = bytearray(), 0
+
+
+def read_session(path, decode_frames=True):
+    # Yields (record type, timestamp, value) for every complete record.
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"'{path}' is not a session recording")
+
+        while True:
+            header = f.read(CHUNK_HEADER.size)
+            if len(header) < CHUNK_HEADER.size:
+                return
+            tag, size, count = CHUNK_HEADER.unpack(header)
+            chunk = f.read(size)
+            if tag != b"CHNK" or len(chunk) < size:
+                return
+
+            offset = 0
+            for _ in range(count):
+                kind, timestamp, length = RECORD_HEADER.unpack_from(chunk, offset)
+                offset += RECORD_HEADER.size
+                data = chunk[offset:offset + length]
+                offset += length
+                yield kind, timestamp, _decode(kind, data, decode_frames)
+
+
+def _decode(kind, data, decode_frames):
+    if kind == RECORD_LANDMARKS:
+        return np.frombuffer(data, dtype=np.float32).reshape(LANDMARK_SHAPE)
+    if kind == RECORD_FRAME:
+        return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR) if decode_frames else data
+    if kind == RECORD_KEYSTROKE:
+        (key_label, used, expected), _ = _unpack_strings(data[1:], 3)
+        return {"key": key_label, "used": used, "expected": expected, "correct": bool(data[0])}
+    return json.loads(data.decode("utf-8"))
+
+
+def new_recording_path():
+    return os.path.join(RECORDINGS_DIR, time.strftime("session_%Y%m%d_%H%M%S.ttarec"))
@@ -0,0 +1,193 @@
+import json
+import os
+import time
+
+import numpy as np
+
+from app.util.config_manager import BASE_DIR
+from app.util.landmarks import FINGERS, finger_mask
+
+HISTORY_DIR = os.path.join(os.path.dirname(BASE_DIR), "history")
+
+# One append-only raw column file per field across all sessions, so history
+# can be opened with np.memmap and reduced without loading it into Python.
+EVENT_COLUMNS = {
+    "session": np.uint32,
+    "key": np.uint16,
+    # finger_mask() of the allowed fingers. Replaces the older "expected"
+    # column, which kept only the first allowed finger's FINGERS index.
+    "expected_mask": np.uint16,
+    "used": np.uint8,
+    "correct": np.bool_,
+    "timestamp": np.float64,
+}
+SESSION_COLUMNS = {
+    "started": np.float64,
+    "duration": np.float32,
+    "wpm": np.float32,
+    "accuracy": np.float32,
+    "first_event": np.uint64,
+}
+
+
+class SessionStore:
+    def __init__(self, root=HISTORY_DIR):
+        self.root = root
+        self.keys_path = os.path.join(root, "keys.json")
+        os.makedirs(root, exist_ok=True)
+        self.key_labels = self._load_key_labels()
+        self.key_index = {label: i for i, label in enumerate(self.key_labels)}
+        self._migrate_expected()
+        self._repair()
+
+    def _column_path(self, name):
+        return os.path.join(self.root, f"{name}.bin")
+
+    def _load_key_labels(self):
+        if not os.path.exists(self.keys_path):
+            return []
+        with open(self.keys_path, "r") as f:
+            return json.load(f)
+
+    def _save_key_labels(self):
+        tmp_path = self.keys_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.key_labels, f)
+        os.replace(tmp_path, self.keys_path)
+
+    def _row_count(self, columns):
+        counts = []
+        for name, dtype in columns.items():
+            path = self._column_path(name)
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            counts.append(size // np.dtype(dtype).itemsize)
+        return min(counts)
+
+    def _migrate_expected(self):
+        # History written before expected_mask stored one FINGERS index per
+        # event; convert it to single-finger masks.
+        legacy = self._column_path("expected")
+        if not os.path.exists(legacy) or os.path.exists(self._column_path("expected_mask")):
+            return
+        indices = np.fromfile(legacy, dtype=np.uint8)
+        masks = np.where(indices > 0, np.left_shift(1, indices.astype(np.uint16)), 0).astype(np.uint16)
+        tmp_path = self._column_path("expected_mask") + ".tmp"
+        masks.tofile(tmp_path)
+        os.replace(tmp_path, self._column_path("expected_mask"))
+        os.remove(legacy)
+
+    def _truncate(self, columns, rows):
+        for name, dtype in columns.items():
+            path = self._column_path(name)
+            if os.path.exists(path) and os.path.getsize(path) != rows * np.dtype(dtype).itemsize:
+                with open(path, "r+b") as f:
+                    f.truncate(rows * np.dtype(dtype).itemsize)
+
+    def _repair(self):
+        # An interrupted append can leave columns with different lengths;
+        # trim every column back to the last complete row. The session row is
+        # written last and commits its events, so events of a session whose
+        # row never made it are dropped too, instead of being counted under
+        # the next session's id.
+        sessions = self._row_count(SESSION_COLUMNS)
+        self._truncate(SESSION_COLUMNS, sessions)
+
+        events = self._row_count(EVENT_COLUMNS)
+        if events:
+            session_ids = np.memmap(self._column_path("session"), dtype=EVENT_COLUMNS["session"],
+                                    mode="r", shape=(events,))
+            events = int(np.searchsorted(session_ids, sessions))
+            del session_ids
+        self._truncate(EVENT_COLUMNS, events)
+
+    def _append(self, columns, values):
+        for name, dtype in columns.items():
+            with open(self._column_path(name), "ab") as f:
+                f.write(np.ascontiguousarray(values[name], dtype=dtype).tobytes())
+
+    def _intern_keys(self, labels):
+        added = False
+        for label in labels:
+            if label not in self.key_index:
+                self.key_index[label] = len(self.key_labels)
+                self.key_labels.append(label)
+                added = True
+        if added:
+            self._save_key_labels()
+        return np.array([self.key_index[label] for label in labels], dtype=np.uint16)
+
+    @property
+    def session_count(self):
+        return self._row_count(SESSION_COLUMNS)
+
+    @property
+    def event_count(self):
+        return self._row_count(EVENT_COLUMNS)
+
+    def append_session(self, events, wpm=0.0, accuracy=0.0, duration=0.0, started=None):
+        # events is KeystrokeLog.columns(): per-log key codes plus their labels.
+        session_id = self.session_count
+        first_event = self.event_count
+        count = len(events["key"])
+
+        event_values = dict(events)
+        event_values["key"] = self._intern_keys(events["key_labels"])[events["key"]]
+        event_values["session"] = np.full(count, session_id, dtype=np.uint32)
+        event_values["expected_mask"] = events["expected"]
+        self._append(EVENT_COLUMNS, event_values)
+
+        self._append(SESSION_COLUMNS, {
+            "started": [time.time() if started is None else started],
+            "duration": [duration],
+            "wpm": [wpm],
+            "accuracy": [accuracy],
+            "first_event": [first_event],
+        })
+        return session_id
+
+    def _open(self, columns, rows):
+        opened = {}
+        for name, dtype in columns.items():
+            if rows:
+                opened[name] = np.memmap(self._column_path(name), dtype=dtype, mode="r", shape=(rows,))
+            else:
+                opened[name] = np.zeros(0, dtype=dtype)
+        return opened
+
+    def events(self):
+        return self._open(EVENT_COLUMNS, self.event_count)
+
+    def sessions(self):
+        return self._open(SESSION_COLUMNS, self.session_count)
+
+    def technique_accuracy(self):
+        correct = self.events()["correct"]
+        return float(np.count_nonzero(correct)) / correct.size * 100 if correct.size else 0.0
+
+    def per_key_accuracy(self):
+        # {key label: (presses, correct presses)}
+        events = self.events()
+        totals = np.bincount(events["key"], minlength=len(self.key_labels))
+        correct = np.bincount(events["key"], weights=events["correct"], minlength=len(self.key_labels))
+        return {label: (int(totals[i]), int(correct[i])) for i, label in enumerate(self.key_labels) if totals[i]}
+
+    def _allowed(self, events):
+        # (events, len(FINGERS)) bool: whether each finger was allowed.
+        bits = np.array([finger_mask(finger) for finger in FINGERS], dtype=np.uint16)
+        return (events["expected_mask"][:, None] & bits) != 0
+
+    def per_finger_accuracy(self):
+        # {expected finger: (presses, correct presses)}; a key with several
+        # allowed fingers counts towards each of them.
+        events = self.events()
+        allowed = self._allowed(events)
+        totals = allowed.sum(axis=0)
+        correct = allowed[events["correct"]].sum(axis=0)
+        return {finger: (int(totals[i]), int(correct[i])) for i, finger in enumerate(FINGERS) if totals[i]}
+
+    def finger_confusion(self):
+        # (expected, used) press counts as a len(FINGERS) x len(FINGERS) matrix,
+        # with a press counted once per allowed finger.
+        events = self.events()
+        used = np.eye(len(FINGERS), dtype=np.int64)[events["used"]]
+        return self._allowed(events).T.astype(np.int64) @ used
@@ -0,0 +1,28 @@
+import time
+
+START_TIME = time.perf_counter()
+
+_marks = {}
+_reported = False
+
+
+def mark(name):
+    # Only the first occurrence of each milestone is kept.
+    if name not in _marks:
+        _marks[name] = time.perf_counter() - START_TIME
+
+
+def elapsed(name):
+    return _marks.get(name)
+
+
+def report():
+    global _reported
+    if _reported:
+        return
+    _reported = True
+
+    print("\n====== Startup Timing ======")
+    for name, seconds in sorted(_marks.items(), key=lambda item: item[1]):
+        print(f"{seconds * 1000:8.1f} ms  {name}")
+    print("============================\n")